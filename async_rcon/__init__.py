@@ -1,58 +1,161 @@
 import asyncio
-import dataclasses
-import struct
-import sys
+import contextlib
+import time
 from logging import Logger
-from typing import Optional
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Optional
 
+from async_rcon.codec import (
+    ENDING_PACKET_RESPONSE_BYTES,
+    Packet,
+    RawPacket,
+    RconCodec,
+    _PacketType,
+    _RequestId,
+    _Utf8Decoder,
+    decode_response,
+)
+from async_rcon.metrics import ConnectionMetrics
+from async_rcon.pacing import FixedPacing, PacingPolicy
+from async_rcon.transport import RconProtocol, TransportMode
 
-class _RequestId:
-    DEFAULT = 0
-    LOGIN_FAIL = -1
+if TYPE_CHECKING:
+    from async_rcon.capture import PacketCapture
+    from async_rcon.parsers import ResponseParser
 
 
-class _PacketType:
-    COMMAND_RESPONSE = 0
-    COMMAND_REQUEST = 2
-    LOGIN_REQUEST = 3
-    ENDING_PACKET = 100
+class _PendingResponse:
+    def __init__(
+        self, future: Optional[asyncio.Future] = None, stream: bool = False
+    ) -> None:
+        self.future: Optional[asyncio.Future] = future
+        self.fragments: list[bytes] = []
+        # Set by any packet for the request, commands like say answer with
+        # an empty body that leaves no fragment.
+        self.answered: bool = False
+        self.queue: Optional[asyncio.Queue] = asyncio.Queue() if stream else None
 
+    def feed(self, body: bytes):
+        if self.queue is not None:
+            self.queue.put_nowait(body)
+        else:
+            self.fragments.append(body)
 
-@dataclasses.dataclass(frozen=True)
-class Packet:
-    request_id: int
-    packet_type: int
-    payload: str
+    def finish(self):
+        if self.future is not None and not self.future.done():
+            self.future.set_result(None)
+        if self.queue is not None:
+            self.queue.put_nowait(None)
 
-    def flush(self) -> bytes:
-        data = struct.pack("<ii", self.request_id, self.packet_type) + (
-            self.payload + "\x00\x00"
-        ).encode("utf8")
-        return struct.pack("<i", len(data)) + data
+    def fail(self, exc: Exception):
+        if self.future is not None and not self.future.done():
+            self.future.set_exception(exc)
+        if self.queue is not None:
+            self.queue.put_nowait(exc)
 
 
 class AsyncRconConnection:
-    BUFFER_SIZE = 2**10
+    BUFFER_SIZE = 2**16
+    MAX_REQUEST_ID = 2**31 - 1
+    # Reconnect once this many commands in a row were abandoned before their
+    # end marker arrived, the server is not catching up with them.
+    MAX_ABANDONED = 3
 
     def __init__(
-        self, address: str, port: int, password: str, *, logger: Optional[Logger] = None
+        self,
+        address: str,
+        port: int,
+        password: str,
+        *,
+        logger: Optional[Logger] = None,
+        pipelined: bool = False,
+        pacing: Optional[PacingPolicy] = None,
+        metrics: Optional[ConnectionMetrics] = None,
+        reconnect: bool = True,
+        ready_timeout: float = 0.0,
+        transport: TransportMode = "streams",
+        capture: Optional["PacketCapture"] = None,
     ):
         self.logger = logger
         self.address = address
         self.port = port
         self.password = password
+        self.pipelined = pipelined
+        self.pacing: PacingPolicy = pacing if pacing is not None else FixedPacing()
+        # None disables collection, every hook below is a single attribute check.
+        self.metrics: Optional[ConnectionMetrics] = metrics
+        # Records every chunk sent and received, same single check as metrics.
+        self.capture: Optional["PacketCapture"] = capture
+        self._ever_connected: bool = False
+        # With reconnect off (see ConnectionSupervisor) failed commands never
+        # connect inline, they wait up to ready_timeout for someone else to.
+        self.reconnect = reconnect
+        self.ready_timeout = ready_timeout
+        self.on_connection_lost: Optional[Callable[[], None]] = None
+        # Called when a caller needs the connection while it is down, lets a
+        # lazily started supervisor open it on first use.
+        self.on_demand: Optional[Callable[[], None]] = None
+        self.last_received: float = 0.0
+        self._ready = asyncio.Event()
+        # "protocol" decodes in data_received instead of awaiting StreamReader.read,
+        # pipelined responses are then routed without a reader task.
+        self.transport: TransportMode = transport
         self.reader: Optional[asyncio.StreamReader] = None
-        self.writer: Optional[asyncio.StreamWriter] = None
+        self.writer: Optional[asyncio.StreamWriter | RconProtocol] = None
+        self._protocol: Optional[RconProtocol] = None
         self.lock = asyncio.Lock()
+        self._codec = RconCodec()
+        # Pipelined mode: one reader task routes packets to pending requests by ID.
+        self._write_lock = asyncio.Lock()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: dict[int, _PendingResponse] = {}
+        self._last_request_id = _RequestId.DEFAULT
+        self._abandoned: int = 0
+
+    @property
+    def connected(self) -> bool:
+        if self.writer is None or self.writer.is_closing():
+            return False
+        if self.pipelined:
+            return self.__reading()
+        return True
+
+    def __reading(self) -> bool:
+        if self._protocol is not None:
+            return self._protocol.routing
+        return self._reader_task is not None and not self._reader_task.done()
 
     async def connect(self, timeout: float = 5.0) -> bool:
         if self.writer is not None:
             await self.disconnect()
 
+        self._codec.reset()
+        metrics = self.metrics
+        started = time.perf_counter() if metrics is not None else 0.0
         try:
-            self.reader, self.writer = await asyncio.wait_for(
-                asyncio.open_connection(self.address, self.port), timeout=timeout
-            )
+            if self.transport == "protocol":
+                _, self._protocol = await asyncio.wait_for(
+                    asyncio.get_running_loop().create_connection(
+                        lambda: RconProtocol(self._codec, self.__on_data),
+                        self.address,
+                        self.port,
+                    ),
+                    timeout=timeout,
+                )
+                self.writer = self._protocol
+            else:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.address, self.port), timeout=timeout
+                )
+            if metrics is not None:
+                connected = time.perf_counter()
+                metrics.connect_duration.observe(connected - started)
+            if self.capture is not None:
+                self.capture.connected(
+                    address=self.address,
+                    port=self.port,
+                    pipelined=self.pipelined,
+                    transport=self.transport,
+                )
             await asyncio.wait_for(
                 self.__send(
                     Packet(_RequestId.DEFAULT, _PacketType.LOGIN_REQUEST, self.password)
@@ -68,10 +171,28 @@ class AsyncRconConnection:
             except Exception:
                 success = False
 
+            if metrics is not None:
+                metrics.login_duration.observe(time.perf_counter() - connected)
+                if success:
+                    metrics.connects += 1
+                    metrics.reconnects += self._ever_connected
+                else:
+                    metrics.connect_failures += 1
             if not success:
                 await self.disconnect()
+            else:
+                self._ever_connected = True
+                self._abandoned = 0
+                self.last_received = time.monotonic()
+                if self.pipelined and self._protocol is not None:
+                    self._protocol.route(self.__on_packet, self.__reader_stopped)
+                elif self.pipelined:
+                    self._reader_task = asyncio.create_task(self.__read_loop())
+                self._ready.set()
             return success
         except (asyncio.TimeoutError, Exception):
+            if metrics is not None:
+                metrics.connect_failures += 1
             if self.logger:
                 self.logger.warning(
                     f"Rcon connection to {self.address}:{self.port} timed out or failed."
@@ -79,73 +200,595 @@ class AsyncRconConnection:
             await self.disconnect()
             return False
 
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        if self.connected:
+            return True
+        if self.on_demand is not None:
+            self.on_demand()
+        if timeout is not None and timeout <= 0:
+            return False
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self.connected
+
+    async def ping(self, timeout: float = 5.0) -> bool:
+        # A lone ending packet is the cheapest round trip, nothing runs on the server.
+        try:
+            return await asyncio.wait_for(self.__ping(), timeout=timeout)
+        except Exception:
+            return False
+
+    async def __ping(self) -> bool:
+        if not self.connected:
+            return False
+        if not self.pipelined:
+            async with self.lock:
+                request_id = await self.__begin(None)
+                return (await self.__receive_for(request_id))[1]
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        request_id = self.__next_request_id()
+        self._pending[request_id] = _PendingResponse(future)
+        try:
+            async with self._write_lock:
+                await self.__send(Packet(request_id, _PacketType.ENDING_PACKET, "lol"))
+            await future
+        finally:
+            self._pending.pop(request_id, None)
+        return True
+
+    def __lost(self):
+        self._ready.clear()
+        if self.on_connection_lost is not None:
+            self.on_connection_lost()
+
+    async def __recover(self) -> bool:
+        if self.reconnect:
+            return await self.connect()
+        return await self.wait_ready(self.ready_timeout)
+
+    async def __ensure_ready(self) -> bool:
+        if self.connected:
+            return True
+        if not self.reconnect:
+            return await self.wait_ready(self.ready_timeout)
+        # Never connected yet, or lost: the first caller connects, the others
+        # find it connected once they get the lock.
+        async with self.lock:
+            return self.connected or await self.connect()
+
     async def disconnect(self):
+        self._ready.clear()
+        if self._reader_task is not None:
+            if self._reader_task is not asyncio.current_task():
+                self._reader_task.cancel()
+            self._reader_task = None
+        self.__fail_pending(ConnectionError("Rcon connection closed"))
+        if self._protocol is not None:
+            # Closing on purpose, not a lost connection.
+            self._protocol.on_lost = None
         if self.writer is not None:
+            self.__lost()
+            if self.capture is not None:
+                self.capture.closed()
             self.writer.close()
-            await self.writer.wait_closed()
+            # A dead socket reports its error here, it is closed either way.
+            with contextlib.suppress(OSError):
+                await self.writer.wait_closed()
             self.writer = None
             self.reader = None
+            self._protocol = None
 
     async def __send(self, packet: Packet):
+        self._codec.encode(packet)
+        await self.__write(
+            self._codec.data_to_send(),
+            redact=packet.packet_type == _PacketType.LOGIN_REQUEST,
+        )
+
+    async def __write(self, data: bytes, packets: int = 1, redact: bool = False):
         assert self.writer is not None
-        self.writer.write(packet.flush())
+        if (delay := self.pacing.reserve()) > 0:
+            await asyncio.sleep(delay)  # Avoid MC-72390
+        if self.capture is not None:
+            self.capture.sent(data, redact)
+        self.writer.write(data)
         await self.writer.drain()
-        await asyncio.sleep(0.03)  # Avoid MC-72390
+        if self.metrics is not None:
+            self.metrics.pacing_sleep += delay
+            self.metrics.bytes_out += len(data)
+            self.metrics.packets_out += packets
+
+    def __locked(self, lock: asyncio.Lock):
+        if self.metrics is None:
+            return lock
+        return self.metrics.timed(lock)
+
+    async def __acquire(self, lock: asyncio.Lock):
+        started = time.perf_counter() if self.metrics is not None else 0.0
+        await lock.acquire()
+        if self.metrics is not None:
+            self.metrics.lock_wait.observe(time.perf_counter() - started)
+
+    async def __resync(self):
+        if self._abandoned >= self.MAX_ABANDONED:
+            if self.logger:
+                self.logger.warning(
+                    "Rcon responses are not catching up, reconnecting..."
+                )
+            await self.disconnect()
+            self._abandoned = 0
+            await self.__recover()
+
+    async def __begin(self, command: Optional[str]) -> int:
+        # Caller holds self.lock. Every command gets its own request ID, so the
+        # leftovers of a cancelled or timed out command are skipped, not misread.
+        await self.__resync()
+        request_id = self.__next_request_id()
+        self._abandoned += 1
+        if command is not None:
+            await self.__send(Packet(request_id, _PacketType.COMMAND_REQUEST, command))
+        await self.__send(Packet(request_id, _PacketType.ENDING_PACKET, "lol"))
+        return request_id
+
+    async def __receive_for(self, request_id: int) -> tuple[bytes, bool]:
+        while True:
+            packet = await self.__receive_packet()
+            if packet.request_id == request_id:
+                body, end = self.__split_marker(packet.body)
+                if end:
+                    self._abandoned = 0
+                return body, end
+            # Leftovers of an abandoned command or a reordered response, both
+            # mean the server is not keeping up with the current pace.
+            self.pacing.on_anomaly()
+            if self.logger:
+                self.logger.debug(
+                    f"Skipping rcon packet for request {packet.request_id}, "
+                    f"waiting for {request_id}"
+                )
 
-    async def __receive(self, length: int) -> bytes:
+    def __record_command(self, started: float, fragments: int, ok: bool = True):
+        metrics = self.metrics
+        assert metrics is not None
+        metrics.commands += 1
+        if ok:
+            metrics.command_latency.observe(time.perf_counter() - started)
+            metrics.fragments.observe(fragments)
+        else:
+            metrics.failed_commands += 1
+
+    def __split_marker(self, body: bytes) -> tuple[bytes, bool]:
+        if body == ENDING_PACKET_RESPONSE_BYTES:
+            return b"", True
+        if body.endswith(ENDING_PACKET_RESPONSE_BYTES):
+            # MC-72390: the response and the marker reply came back merged.
+            self.pacing.on_anomaly()
+            return body[: -len(ENDING_PACKET_RESPONSE_BYTES)], True
+        return body, False
+
+    def __on_data(self, data: bytes):
+        self.last_received = time.monotonic()
+        if self.metrics is not None:
+            self.metrics.bytes_in += len(data)
+        if self.capture is not None:
+            self.capture.received(data)
+
+    def __on_packet(self, packet: RawPacket):
+        if self.metrics is not None:
+            self.metrics.packets_in += 1
+        self.__route(packet)
+
+    async def __receive_packet(self) -> RawPacket:
+        if self._protocol is not None:
+            packet = await self._protocol.next_packet()
+            if self.metrics is not None:
+                self.metrics.packets_in += 1
+            return packet
         assert self.reader is not None
-        data = b""
-        while len(data) < length:
-            chunk = await self.reader.read(length - len(data))
+        while (packet := self._codec.next_raw_packet()) is None:
+            chunk = await self.reader.read(self.BUFFER_SIZE)
             if not chunk:
                 raise ConnectionError("Connection closed while receiving data")
-            data += chunk
-        return data
+            self._codec.receive_data(chunk)
+            self.last_received = time.monotonic()
+            if self.metrics is not None:
+                self.metrics.bytes_in += len(chunk)
+            if self.capture is not None:
+                self.capture.received(chunk)
+        if self.metrics is not None:
+            self.metrics.packets_in += 1
+        return packet
 
-    async def __receive_packet(self) -> Packet:
-        length_bytes = await self.__receive(4)
-        length = struct.unpack("<i", length_bytes)[0]
-        data = await self.__receive(length)
+    def __next_request_id(self) -> int:
+        request_id = self._last_request_id
+        while True:
+            request_id = request_id + 1 if request_id < self.MAX_REQUEST_ID else 1
+            if request_id not in self._pending:
+                self._last_request_id = request_id
+                return request_id
 
-        request_id = struct.unpack("<i", data[0:4])[0]
-        packet_type = struct.unpack("<i", data[4:8])[0]
-        payload = data[8:-2].decode("utf8")
+    def __fail_pending(self, exc: Exception):
+        pending, self._pending = self._pending, {}
+        for entry in pending.values():
+            entry.fail(exc)
 
-        return Packet(request_id, packet_type, payload)
+    def __route(self, packet: RawPacket):
+        entry = self._pending.get(packet.request_id)
+        if entry is None:
+            # Late fragments of an abandoned request.
+            self.pacing.on_anomaly()
+            if self.logger:
+                self.logger.debug(
+                    f"Dropping rcon packet for unknown request {packet.request_id}"
+                )
+            return
+        body, end = self.__split_marker(packet.body)
+        entry.answered = True
+        if body:
+            entry.feed(body)
+        if end:
+            del self._pending[packet.request_id]
+            entry.finish()
 
-    async def send_command(
-        self, command: str, max_retry_time: int = 3
+    def __reader_stopped(self, exc: Exception):
+        if self.logger:
+            self.logger.warning(f"Rcon reader stopped: {exc}")
+        self.pacing.on_anomaly()
+        self._reader_task = None
+        self.__fail_pending(exc)
+        self.__lost()
+
+    async def __read_loop(self):
+        try:
+            while True:
+                self.__route(await self.__receive_packet())
+        except Exception as e:
+            self.__reader_stopped(e)
+
+    async def __submit(self, command: str, entry: _PendingResponse) -> int:
+        if not self.__reading():
+            raise ConnectionError("Rcon connection is not established")
+        request_id = self.__next_request_id()
+        self._pending[request_id] = entry
+        try:
+            async with self.__locked(self._write_lock):
+                await self.__send(
+                    Packet(request_id, _PacketType.COMMAND_REQUEST, command)
+                )
+                await self.__send(Packet(request_id, _PacketType.ENDING_PACKET, "lol"))
+        except BaseException:
+            self._pending.pop(request_id, None)
+            raise
+        return request_id
+
+    async def __request(self, command: str) -> tuple[str, int]:
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        entry = _PendingResponse(future)
+        request_id = await self.__submit(command, entry)
+        try:
+            await future
+        finally:
+            self._pending.pop(request_id, None)
+        self.pacing.on_success()
+        return decode_response(entry.fragments), len(entry.fragments)
+
+    async def __send_command_pipelined(
+        self, command: str, max_retry_time: int, started: float
     ) -> Optional[str]:
-        async with self.lock:
-            for _ in range(max_retry_time):
+        for attempt in range(max_retry_time):
+            if attempt and self.metrics is not None:
+                self.metrics.retries += 1
+            if not await self.__ensure_ready():
+                break
+            try:
+                result, fragments = await self.__request(command)
+                if self.metrics is not None:
+                    self.__record_command(started, fragments)
+                return result
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"Rcon packet receive failed: {e}")
+                if not self.reconnect:
+                    continue
                 try:
-                    await self.__send(
-                        Packet(_RequestId.DEFAULT, _PacketType.COMMAND_REQUEST, command)
-                    )
-                    await self.__send(
-                        Packet(_RequestId.DEFAULT, _PacketType.ENDING_PACKET, "lol")
+                    # Only the first failed caller reconnects, the others reuse it.
+                    async with self.lock:
+                        if not self.__reading():
+                            if not await self.connect():
+                                break
+                except Exception:
+                    break
+        if self.metrics is not None:
+            self.__record_command(started, 0, ok=False)
+        return None
+
+    async def send_command(
+        self, command: str, max_retry_time: int = 3, *, timeout: Optional[float] = None
+    ) -> Optional[str]:
+        # timeout covers the whole call, including waiting for the lock and retries.
+        started = time.perf_counter() if self.metrics is not None else 0.0
+        try:
+            async with asyncio.timeout(timeout):
+                if self.pipelined:
+                    return await self.__send_command_pipelined(
+                        command, max_retry_time, started
                     )
-                    result = ""
+                return await self.__send_command_locked(
+                    command, max_retry_time, started
+                )
+        except TimeoutError:
+            if self.metrics is not None:
+                self.__record_command(started, 0, ok=False)
+            raise
+
+    async def __send_command_locked(
+        self, command: str, max_retry_time: int, started: float
+    ) -> Optional[str]:
+        if not await self.__ensure_ready():
+            if self.metrics is not None:
+                self.__record_command(started, 0, ok=False)
+            return None
+        async with self.__locked(self.lock):
+            for attempt in range(max_retry_time):
+                if attempt and self.metrics is not None:
+                    self.metrics.retries += 1
+                try:
+                    request_id = await self.__begin(command)
+                    fragments: list[bytes] = []
                     while True:
-                        packet = await self.__receive_packet()
-                        if (
-                            packet.payload
-                            == f"Unknown request {hex(_PacketType.ENDING_PACKET)[2:]}"
-                        ):
+                        body, end = await self.__receive_for(request_id)
+                        if body:
+                            fragments.append(body)
+                        if end:
                             break
-                        result += packet.payload
-                    return result
+                    self.pacing.on_success()
+                    if self.metrics is not None:
+                        self.__record_command(started, len(fragments))
+                    return decode_response(fragments)
                 except Exception as e:
                     if self.logger:
                         self.logger.warning(f"Rcon packet receive failed: {e}")
+                    self.pacing.on_anomaly()
                     try:
                         await self.disconnect()
-                        if await self.connect():
+                        if await self.__recover():
                             continue
                     except Exception:
                         break
+            if self.metrics is not None:
+                self.__record_command(started, 0, ok=False)
             return None
 
+    async def send_command_parsed(
+        self,
+        command: str,
+        parser: Optional["ResponseParser"] = None,
+        *,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        # Structured result from async_rcon.parsers, None when the command failed.
+        # Imported here, the parsers compile their patterns on import.
+        from async_rcon.parsers import require_parser
+
+        parse = parser or require_parser(command)
+        response = await self.send_command(command, timeout=timeout)
+        return None if response is None else parse(response)
+
+    async def stream_command(
+        self, command: str, *, timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        # Yields text as fragments arrive. Unlike send_command there is no retry,
+        # errors are raised because part of the response may already be consumed.
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        if self.pipelined:
+            async for text in self.__stream_pipelined(command, deadline):
+                yield text
+            return
+        started = time.perf_counter() if self.metrics is not None else 0.0
+        received: int = 0
+        async with asyncio.timeout_at(deadline):
+            if not await self.__ensure_ready():
+                raise ConnectionError("Rcon connection is not established")
+            await self.__acquire(self.lock)
+        try:
+            finished: bool = False
+            decoder = _Utf8Decoder(errors="replace")
+            async with asyncio.timeout_at(deadline):
+                request_id = await self.__begin(command)
+            while not finished:
+                async with asyncio.timeout_at(deadline):
+                    body, finished = await self.__receive_for(request_id)
+                received += bool(body)
+                if text := decoder.decode(body, final=finished):
+                    yield text
+            self.pacing.on_success()
+            if self.metrics is not None:
+                self.__record_command(started, received)
+        except TimeoutError:
+            # The rest of the response is skipped by request ID later on.
+            if self.metrics is not None:
+                self.__record_command(started, received, ok=False)
+            raise
+        except Exception as e:
+            if self.metrics is not None:
+                self.__record_command(started, received, ok=False)
+            if self.logger:
+                self.logger.warning(f"Rcon packet receive failed: {e}")
+            self.pacing.on_anomaly()
+            await self.disconnect()
+            if self.reconnect:
+                await self.connect()
+            raise
+        finally:
+            self.lock.release()
+
+    async def __stream_pipelined(
+        self, command: str, deadline: Optional[float]
+    ) -> AsyncIterator[str]:
+        started = time.perf_counter() if self.metrics is not None else 0.0
+        received: int = 0
+        async with asyncio.timeout_at(deadline):
+            if not await self.__ensure_ready():
+                raise ConnectionError("Rcon connection is not established")
+            entry = _PendingResponse(stream=True)
+            assert entry.queue is not None
+            request_id = await self.__submit(command, entry)
+        decoder = _Utf8Decoder(errors="replace")
+        try:
+            while True:
+                async with asyncio.timeout_at(deadline):
+                    item = await entry.queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                received += 1
+                if text := decoder.decode(item):
+                    yield text
+            if text := decoder.decode(b"", final=True):
+                yield text
+            self.pacing.on_success()
+            if self.metrics is not None:
+                self.__record_command(started, received)
+        except Exception:
+            if self.metrics is not None:
+                self.__record_command(started, received, ok=False)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    def __encode_batch(
+        self, commands: list[str], chunk_size: int
+    ) -> tuple[list[int], int, list[bytes]]:
+        # Commands on one connection are answered in order, so a single trailing
+        # marker is enough to know that every response before it has arrived.
+        request_ids = [self.__next_request_id() for _ in commands]
+        marker_id = self.__next_request_id()
+        packets = [
+            Packet(request_id, _PacketType.COMMAND_REQUEST, command)
+            for request_id, command in zip(request_ids, commands)
+        ]
+        packets.append(Packet(marker_id, _PacketType.ENDING_PACKET, "lol"))
+        chunks: list[bytes] = []
+        for i in range(0, len(packets), chunk_size):
+            for packet in packets[i : i + chunk_size]:
+                self._codec.encode(packet)
+            chunks.append(self._codec.data_to_send())
+        return request_ids, marker_id, chunks
+
+    async def send_commands(
+        self,
+        commands: list[str],
+        *,
+        chunk_size: int = 1,
+        timeout: Optional[float] = None,
+    ) -> list[Optional[str]]:
+        async with asyncio.timeout(timeout):
+            return await self.__send_commands(commands, chunk_size)
+
+    async def __send_commands(
+        self, commands: list[str], chunk_size: int
+    ) -> list[Optional[str]]:
+        # chunk_size is the number of packets per write. Vanilla servers drop the
+        # connection when several packets arrive in one read (MC-72390), raise it
+        # only for servers that parse the stream properly.
+        if not commands:
+            return []
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        entries: dict[int, _PendingResponse] = {}
+        completed: bool = False
+        # Commands plus the trailing marker, chunk_size packets per write.
+        total_packets = len(commands) + 1
+        chunk_packets = [
+            min(chunk_size, total_packets - i)
+            for i in range(0, total_packets, chunk_size)
+        ]
+        if self.metrics is not None:
+            self.metrics.batches += 1
+        if not await self.__ensure_ready():
+            if self.metrics is not None:
+                self.metrics.commands += len(commands)
+                self.metrics.failed_commands += len(commands)
+            return [None] * len(commands)
+        if self.pipelined:
+            request_ids, marker_id, chunks = self.__encode_batch(commands, chunk_size)
+            marker: asyncio.Future = asyncio.get_running_loop().create_future()
+            for request_id in request_ids:
+                entries[request_id] = self._pending[request_id] = _PendingResponse(
+                    marker
+                )
+            self._pending[marker_id] = _PendingResponse(marker)
+            try:
+                if not self.__reading():
+                    raise ConnectionError("Rcon connection is not established")
+                async with self.__locked(self._write_lock):
+                    for chunk, packets in zip(chunks, chunk_packets):
+                        await self.__write(chunk, packets)
+                await marker
+                completed = True
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"Rcon batch failed: {e}")
+                self.pacing.on_anomaly()
+            finally:
+                for request_id in (*request_ids, marker_id):
+                    self._pending.pop(request_id, None)
+        else:
+            async with self.__locked(self.lock):
+                request_ids, marker_id, chunks = self.__encode_batch(
+                    commands, chunk_size
+                )
+                for request_id in request_ids:
+                    entries[request_id] = _PendingResponse()
+                try:
+                    await self.__resync()
+                    self._abandoned += 1
+                    for chunk, packets in zip(chunks, chunk_packets):
+                        await self.__write(chunk, packets)
+                    while True:
+                        packet = await self.__receive_packet()
+                        if packet.request_id == marker_id:
+                            self._abandoned = 0
+                            completed = True
+                            break
+                        entry = entries.get(packet.request_id)
+                        if entry is None:
+                            self.pacing.on_anomaly()
+                            continue
+                        entry.answered = True
+                        if packet.body:
+                            entry.fragments.append(packet.body)
+                except Exception as e:
+                    if self.logger:
+                        self.logger.warning(f"Rcon batch failed: {e}")
+                    self.pacing.on_anomaly()
+                    await self.disconnect()
+                    if self.reconnect:
+                        await self.connect()
+        if self.metrics is not None:
+            failed = sum(not entries[request_id].answered for request_id in request_ids)
+            self.metrics.commands += len(request_ids)
+            self.metrics.failed_commands += failed
+        if completed:
+            self.pacing.on_success()
+        else:
+            # The last answered command may have been cut off mid-response.
+            for request_id in reversed(request_ids):
+                if entries[request_id].answered:
+                    entries[request_id].answered = False
+                    break
+        # Every command is answered with at least one packet, possibly with an
+        # empty body, so an unanswered one means the command or its response
+        # was lost.
+        return [
+            decode_response(entry.fragments) if entry.answered else None
+            for entry in (entries[request_id] for request_id in request_ids)
+        ]
+
 
 async def main():
     rcon = AsyncRconConnection("example.com", 25575, "password")
@@ -166,10 +809,3 @@ async def main():
             print("Exited!")
     else:
         print("Failed to connect RCON server!")
-
-
-if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        sys.exit()
@@ -0,0 +1,10 @@
+import asyncio
+import sys
+
+from async_rcon import main
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        sys.exit()
@@ -0,0 +1,375 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, AsyncIterator, Optional, get_args
+
+from async_rcon import AsyncRconConnection
+from async_rcon.metrics import ConnectionMetrics
+from async_rcon.mock_server import MockRconServer
+from async_rcon.pacing import PacingMode, create_pacing
+from async_rcon.supervisor import ConnectionSupervisor
+from async_rcon.transport import TransportMode, install_uvloop
+
+SCENARIOS = (
+    "sequential",
+    "concurrent_locked",
+    "concurrent_pipelined",
+    "batch",
+    "large_response",
+    "retained_memory",
+    "startup",
+)
+
+
+# Scenario metrics where a lower value than the baseline is a regression.
+THROUGHPUT_METRICS = ("commands_per_second", "megabytes_per_second")
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict[str, float]:
+    return {
+        "commands": len(latencies),
+        "elapsed_seconds": elapsed,
+        "commands_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+class Benchmark:
+    def __init__(self, server: MockRconServer, args: argparse.Namespace) -> None:
+        self.server = server
+        self.args = args
+
+    async def connect(
+        self,
+        pipelined: bool = False,
+        *,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        metrics: Optional[ConnectionMetrics] = None,
+    ) -> AsyncRconConnection:
+        connection = AsyncRconConnection(
+            host or self.server.host,
+            port or self.server.port,
+            self.server.password,
+            pipelined=pipelined,
+            pacing=create_pacing(self.args.pacing),
+            metrics=metrics,
+            transport=self.args.transport,
+        )
+        if not await connection.connect():
+            raise ConnectionError("Cannot connect to the mock server")
+        return connection
+
+    async def sequential(self) -> dict[str, Any]:
+        connection = await self.connect()
+        latencies: list[float] = []
+        start = time.perf_counter()
+        for i in range(self.args.commands):
+            sent = time.perf_counter()
+            await connection.send_command(f"echo {i}")
+            latencies.append(time.perf_counter() - sent)
+        elapsed = time.perf_counter() - start
+        await connection.disconnect()
+        return summarize(latencies, elapsed)
+
+    async def concurrent(self, pipelined: bool) -> dict[str, Any]:
+        connection = await self.connect(pipelined)
+        latencies: list[float] = []
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for i in range(self.args.commands):
+            queue.put_nowait(i)
+
+        async def worker():
+            while not queue.empty():
+                i = queue.get_nowait()
+                sent = time.perf_counter()
+                await connection.send_command(f"echo {i}")
+                latencies.append(time.perf_counter() - sent)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - start
+        await connection.disconnect()
+        return {**summarize(latencies, elapsed), "concurrency": self.args.concurrency}
+
+    async def batch(self) -> dict[str, Any]:
+        connection = await self.connect()
+        commands = [f"echo {i}" for i in range(self.args.commands)]
+        start = time.perf_counter()
+        results = await connection.send_commands(commands)
+        elapsed = time.perf_counter() - start
+        await connection.disconnect()
+        return {
+            "commands": len(commands),
+            "failed": sum(result is None for result in results),
+            "elapsed_seconds": elapsed,
+            "commands_per_second": len(commands) / elapsed if elapsed else 0.0,
+        }
+
+    async def large_response(self) -> dict[str, Any]:
+        # The mock server runs in a child process, so the traced memory is the
+        # client's alone. send_command holds the whole response, stream_command
+        # only the fragment being decoded.
+        size: int = self.args.large_size
+        repeats: int = self.args.large_repeats
+        async with self.__child_server() as (host, port):
+            metrics = ConnectionMetrics()
+            connection = await self.connect(host=host, port=port, metrics=metrics)
+            failed = 0
+            start = time.perf_counter()
+            for _ in range(repeats):
+                response = await connection.send_command(f"blob {size}")
+                failed += response is None or len(response) != size
+                del response
+            elapsed = time.perf_counter() - start
+            received = metrics.bytes_in
+            start = time.perf_counter()
+            for _ in range(repeats):
+                failed += await self.__stream_blob(connection, size) != size
+            stream_elapsed = time.perf_counter() - start
+            # Peaks come from one more run of each, tracing slows the timed ones.
+            tracemalloc.start()
+            response = await connection.send_command(f"blob {size}")
+            _, peak = tracemalloc.get_traced_memory()
+            del response
+            tracemalloc.reset_peak()
+            await self.__stream_blob(connection, size)
+            _, stream_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            await connection.disconnect()
+        megabytes = received / 2**20
+        return {
+            "response_characters": size,
+            "repeats": repeats,
+            "failed": failed,
+            "elapsed_seconds": elapsed,
+            "megabytes_per_second": megabytes / elapsed if elapsed else 0.0,
+            "peak_traced_bytes": peak,
+            "stream_megabytes_per_second": (
+                megabytes / stream_elapsed if stream_elapsed else 0.0
+            ),
+            "stream_peak_traced_bytes": stream_peak,
+        }
+
+    async def retained_memory(self) -> dict[str, Any]:
+        # What is still allocated after the commands, not how much they
+        # allocated on the way. Should stay near zero per command.
+        connection = await self.connect()
+        await connection.send_command("echo warmup")
+        commands: int = self.args.commands
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        traced, _ = tracemalloc.get_traced_memory()
+        for i in range(commands):
+            await connection.send_command(f"echo {i}")
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await connection.disconnect()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        differences = after.filter_traces(filters).compare_to(
+            before.filter_traces(filters), "lineno"
+        )
+        return {
+            "commands": commands,
+            "peak_traced_bytes": peak - traced,
+            "retained_bytes_per_command": sum(d.size_diff for d in differences)
+            / commands,
+            "retained_blocks_per_command": sum(d.count_diff for d in differences)
+            / commands,
+        }
+
+    async def __stream_blob(self, connection: AsyncRconConnection, size: int) -> int:
+        characters = 0
+        async for text in connection.stream_command(f"blob {size}"):
+            characters += len(text)
+        return characters
+
+    @contextlib.asynccontextmanager
+    async def __child_server(self) -> AsyncIterator[tuple[str, int]]:
+        args = self.args
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "async_rcon.mock_server",
+            "--port",
+            "0",
+            "--password",
+            self.server.password,
+            "--latency",
+            str(args.latency),
+            "--jitter",
+            str(args.jitter),
+            "--fragment-size",
+            str(args.fragment_size),
+            stdout=asyncio.subprocess.PIPE,
+        )
+        try:
+            assert process.stdout is not None
+            # "Mock RCON server listening on host:port"
+            line = (await process.stdout.readline()).decode("utf8").strip()
+            host, _, port = line.rpartition(" ")[2].rpartition(":")
+            if not port.isdigit():
+                raise ConnectionError("The mock server process did not start")
+            yield host, int(port)
+        finally:
+            if process.returncode is None:
+                process.terminate()
+            await process.wait()
+
+    async def startup(self) -> dict[str, Any]:
+        # A fresh interpreter, the modules are already imported in this one.
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-c",
+            "import time; start = time.perf_counter(); import async_rcon; "
+            "print(time.perf_counter() - start)",
+            stdout=asyncio.subprocess.PIPE,
+        )
+        stdout, _ = await process.communicate()
+        import_seconds = float(stdout)
+
+        ready: dict[str, float] = {}
+        first_command: dict[str, float] = {}
+        failed = 0
+        for mode in ("eager", "lazy"):
+            # Commands wait up to ready_timeout for the connect they trigger.
+            connection = AsyncRconConnection(
+                self.server.host,
+                self.server.port,
+                self.server.password,
+                pacing=create_pacing(self.args.pacing),
+                transport=self.args.transport,
+                ready_timeout=5.0,
+            )
+            supervisor = ConnectionSupervisor(connection)
+            start = time.perf_counter()
+            supervisor.start(lazy=mode == "lazy")
+            if mode == "eager":
+                await connection.wait_ready(None)
+            ready[mode] = time.perf_counter() - start
+            response = await connection.send_command("echo first")
+            first_command[mode] = time.perf_counter() - start
+            failed += response is None
+            await supervisor.stop()
+        return {
+            "import_ms": import_seconds * 1000,
+            "eager_ready_ms": ready["eager"] * 1000,
+            "eager_first_command_ms": first_command["eager"] * 1000,
+            "lazy_start_ms": ready["lazy"] * 1000,
+            "lazy_first_command_ms": first_command["lazy"] * 1000,
+            "failed": failed,
+        }
+
+
+async def run_benchmarks(args: argparse.Namespace) -> dict[str, Any]:
+    scenarios: dict[str, Any] = {}
+    server_options = dict(
+        latency=args.latency,
+        jitter=args.jitter,
+        fragment_size=args.fragment_size,
+        seed=args.seed,
+    )
+    for name in args.scenarios:
+        # Every scenario gets a fresh server so byte counters do not leak across.
+        async with MockRconServer(**server_options) as server:
+            bench = Benchmark(server, args)
+            match name:
+                case "sequential":
+                    scenarios[name] = await bench.sequential()
+                case "concurrent_locked":
+                    scenarios[name] = await bench.concurrent(pipelined=False)
+                case "concurrent_pipelined":
+                    scenarios[name] = await bench.concurrent(pipelined=True)
+                case "batch":
+                    scenarios[name] = await bench.batch()
+                case "large_response":
+                    scenarios[name] = await bench.large_response()
+                case "retained_memory":
+                    scenarios[name] = await bench.retained_memory()
+                case "startup":
+                    scenarios[name] = await bench.startup()
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "parameters": {
+            key: value for key, value in vars(args).items() if key != "baseline"
+        },
+        "scenarios": scenarios,
+    }
+
+
+def find_regressions(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    regressions: list[str] = []
+    for name, metrics in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name, {})
+        for metric in THROUGHPUT_METRICS:
+            if metric in metrics and previous.get(metric):
+                if metrics[metric] < previous[metric] * (1 - tolerance):
+                    regressions.append(
+                        f"{name}.{metric}: {metrics[metric]:.1f} < "
+                        f"baseline {previous[metric]:.1f}"
+                    )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark AsyncRconConnection against a local mock server."
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.001)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fragment-size", type=int, default=4096)
+    parser.add_argument("--large-size", type=int, default=4 * 2**20)
+    parser.add_argument("--large-repeats", type=int, default=3)
+    parser.add_argument("--pacing", choices=get_args(PacingMode), default="none")
+    parser.add_argument(
+        "--transport", choices=get_args(TransportMode), default="streams"
+    )
+    parser.add_argument("--uvloop", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file.")
+    parser.add_argument("--baseline", help="Compare against earlier JSON results.")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    if args.uvloop and not install_uvloop():
+        print("uvloop is not installed, using the default event loop", file=sys.stderr)
+        args.uvloop = False
+    results = asyncio.run(run_benchmarks(args))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline, encoding="utf8") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Optional, Protocol
+
+from async_rcon.scheduler import CommandScheduler, Priority
+
+if TYPE_CHECKING:
+    from async_rcon.parsers import ResponseParser
+
+
+# Read-only commands and how long (seconds) their responses stay fresh.
+DEFAULT_CACHE_RULES: dict[str, float] = {
+    r"list( uuids)?": 1.0,
+    r"time query \w+": 1.0,
+    r"worldborder get": 5.0,
+    r"scoreboard players get \S+ \S+": 1.0,
+    r"scoreboard objectives list": 5.0,
+    r"whitelist list": 5.0,
+    r"seed": 3600.0,
+}
+
+
+class CommandSender(Protocol):
+    async def send_command(self, command: str) -> Optional[str]: ...
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        target: CommandSender,
+        *,
+        rules: Optional[dict[str, float]] = None,
+        max_entries: int = 256,
+        invalidate_on_write: bool = True,
+    ):
+        self.target = target
+        self.max_entries = max_entries
+        self.invalidate_on_write = invalidate_on_write
+        self._rules: list[tuple[re.Pattern, float]] = [
+            (re.compile(pattern), ttl)
+            for pattern, ttl in (
+                rules if rules is not None else DEFAULT_CACHE_RULES
+            ).items()
+        ]
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+        self.coalesced: int = 0
+        self.evictions: int = 0
+        self.invalidations: int = 0
+
+    def ttl_for(self, command: str) -> Optional[float]:
+        for pattern, ttl in self._rules:
+            if pattern.fullmatch(command):
+                return ttl
+        return None
+
+    async def send_command(
+        self,
+        command: str,
+        *,
+        priority: Priority = Priority.PLUGIN,
+        source: str = "",
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        # priority and source reach a CommandScheduler target, they are not part
+        # of the cache key. Coalesced callers share the first caller's request.
+        async with asyncio.timeout(timeout):
+            return await self.__send_command(command, priority, source)
+
+    async def __send_command(
+        self, command: str, priority: Priority, source: str
+    ) -> Optional[str]:
+        command = command.strip()
+        ttl = self.ttl_for(command)
+        if ttl is None:
+            self.observe(command)
+            return await self.__send(command, priority, source)
+        cached = self._entries.get(command)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self._entries.move_to_end(command)
+                self.hits += 1
+                return cached[1]
+            del self._entries[command]
+        inflight = self._inflight.get(command)
+        if inflight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The leading request was cancelled, not this caller.
+                if not inflight.cancelled():
+                    raise
+                return await self.__send_command(command, priority, source)
+        self.misses += 1
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[command] = future
+        try:
+            result = await self.__send(command, priority, source)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(command, None)
+        future.set_result(result)
+        if result is not None:
+            self.__store(command, time.monotonic() + ttl, result)
+        return result
+
+    async def send_command_parsed(
+        self,
+        command: str,
+        parser: Optional["ResponseParser"] = None,
+        *,
+        priority: Priority = Priority.PLUGIN,
+        source: str = "",
+        timeout: Optional[float] = None,
+    ) -> Any:
+        # Structured result from async_rcon.parsers, None when the command failed.
+        from async_rcon.parsers import require_parser
+
+        parse = parser or require_parser(command)
+        response = await self.send_command(
+            command, priority=priority, source=source, timeout=timeout
+        )
+        return None if response is None else parse(response)
+
+    async def __send(
+        self, command: str, priority: Priority, source: str
+    ) -> Optional[str]:
+        if isinstance(self.target, CommandScheduler):
+            return await self.target.send_command(
+                command, priority=priority, source=source
+            )
+        return await self.target.send_command(command)
+
+    def observe(self, command: str):
+        # Call for commands sent around the cache so writes still invalidate it.
+        if self.invalidate_on_write and self.ttl_for(command.strip()) is None:
+            self.invalidate()
+
+    def invalidate(self, pattern: Optional[str] = None):
+        if pattern is None:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            return
+        compiled = re.compile(pattern)
+        for command in [c for c in self._entries if compiled.fullmatch(c)]:
+            del self._entries[command]
+            self.invalidations += 1
+
+    def __store(self, command: str, expires: float, result: str):
+        self._entries[command] = (expires, result)
+        self._entries.move_to_end(command)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
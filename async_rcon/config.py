@@ -1,15 +1,20 @@
 import asyncio
+import functools
 import io
 import os
 from asyncio import AbstractEventLoop
 from typing import Any
 
-import aiofiles
 from mcdreforged.api.all import PluginServerInterface
+
+# Not deferred like ruamel: the models below subclass it, and importing the
+# MCDR API above has already loaded it. Only the plugin entry imports this
+# module, the connection classes never do.
 from pydantic import BaseModel
-from ruamel.yaml import YAML
 
-yaml: YAML = YAML()
+from async_rcon.cache import DEFAULT_CACHE_RULES
+from async_rcon.pacing import PacingMode
+from async_rcon.transport import TransportMode
 
 
 class CustomServerConnectInfo(BaseModel):
@@ -18,22 +23,125 @@ class CustomServerConnectInfo(BaseModel):
     password: str = "password"
 
 
+class NamedServerConnectInfo(CustomServerConnectInfo):
+    name: str
+    tags: list[str] = []
+
+
+class PoolConfig(BaseModel):
+    enabled: bool = False
+    min_size: int = 2
+    max_size: int = 4
+
+
+class PacingConfig(BaseModel):
+    mode: PacingMode = "fixed"
+    delay: float = 0.03
+    packets_per_second: float = 30.0
+    burst: int = 1
+    max_delay: float = 0.1
+
+
+class CacheConfig(BaseModel):
+    enabled: bool = False
+    max_entries: int = 256
+    invalidate_on_write: bool = True
+    rules: dict[str, float] = dict(DEFAULT_CACHE_RULES)
+
+
+class MetricsConfig(BaseModel):
+    enabled: bool = False
+    prometheus_file: str = ""
+    prometheus_interval: float = 15.0
+
+
+class SupervisorConfig(BaseModel):
+    keepalive_interval: float = 15.0
+    keepalive_timeout: float = 5.0
+    connect_timeout: float = 5.0
+    backoff_initial: float = 0.5
+    backoff_max: float = 30.0
+    ready_timeout: float = 3.0
+
+
+class SchedulerConfig(BaseModel):
+    enabled: bool = True
+    concurrency: int = 0
+    max_queued: int = 256
+    full_timeout: float = 1.0
+
+
+class PeriodicConfig(BaseModel):
+    max_concurrent: int = 2
+    timeout: float = 10.0
+    spread: float = 5.0
+
+
+class OutboxConfig(BaseModel):
+    enabled: bool = False
+    max_size: int = 10000
+    ttl: float = 600.0
+    batch_size: int = 100
+    retry_max: float = 10.0
+    # Journal in the plugin data folder, empty keeps queued commands in memory.
+    persist_file: str = ""
+
+
+class CaptureConfig(BaseModel):
+    enabled: bool = False
+    # In the plugin data folder, replay it with python -m async_rcon.replay.
+    file: str = "capture.rcap"
+    max_size_mb: float = 64.0
+
+
+class ReloadConfig(BaseModel):
+    watch: bool = False
+    interval: float = 2.0
+
+
 class PluginConfig(BaseModel):
     custom_server: CustomServerConnectInfo = CustomServerConnectInfo()
     use_mcdr_config: bool = True
+    pipelined: bool = False
+    lazy_connect: bool = False
+    command_timeout: float = 30.0
+    transport: TransportMode = "streams"
+    pool: PoolConfig = PoolConfig()
+    pacing: PacingConfig = PacingConfig()
+    servers: list[NamedServerConnectInfo] = []
+    cache: CacheConfig = CacheConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    supervisor: SupervisorConfig = SupervisorConfig()
+    scheduler: SchedulerConfig = SchedulerConfig()
+    periodic: PeriodicConfig = PeriodicConfig()
+    outbox: OutboxConfig = OutboxConfig()
+    capture: CaptureConfig = CaptureConfig()
+    reload: ReloadConfig = ReloadConfig()
+
+
+@functools.cache
+def get_yaml():
+    # Imported on first use, like aiofiles below, to keep plugin import fast.
+    from ruamel.yaml import YAML
+
+    return YAML()
 
 
 async def load_dict_from_yml(file_path: str) -> dict:
+    import aiofiles
+
     async with aiofiles.open(file_path, mode="r") as f:
         content: str = await f.read()
         loop: AbstractEventLoop = asyncio.get_event_loop()
-        result: dict = await loop.run_in_executor(None, yaml.load, content)
+        result: dict = await loop.run_in_executor(None, get_yaml().load, content)
         return result
 
 
 async def save_dict_to_yml(file_path: str, data: dict) -> None:
+    import aiofiles
+
     stream = io.StringIO()
-    yaml.dump(data, stream)
+    get_yaml().dump(data, stream)
     async with aiofiles.open(file_path, mode="w") as f:
         await f.write(stream.getvalue())
 
@@ -72,20 +180,66 @@ def merge_dict(default: dict, actual: dict) -> dict:
     return merged
 
 
-async def load_config(server: PluginServerInterface) -> PluginConfig:
-    config_path: str = os.path.join(server.get_data_folder(), "config.yml")
-    default_config_dict = PluginConfig().model_dump()
+def diff_config(old: PluginConfig, new: PluginConfig) -> set[str]:
+    # Dotted paths of every changed option, lists are compared as a whole.
+    def walk(a: Any, b: Any, prefix: str) -> set[str]:
+        if isinstance(a, dict) and isinstance(b, dict):
+            changed = set()
+            for key in a.keys() | b.keys():
+                changed |= walk(a.get(key), b.get(key), f"{prefix}{key}.")
+            return changed
+        return set() if a == b else {prefix[:-1]}
+
+    return walk(old.model_dump(), new.model_dump(), "")
+
+
+@functools.cache
+def get_default_config_dict() -> dict:
+    # Built once, callers must not modify it.
+    return PluginConfig().model_dump()
+
+
+def get_config_path(server: PluginServerInterface) -> str:
+    return os.path.join(server.get_data_folder(), "config.yml")
+
+
+async def load_config(
+    server: PluginServerInterface, *, fallback: bool = True
+) -> PluginConfig:
+    # Without fallback (reloads) a file that cannot be used raises ValueError
+    # instead of returning the defaults, so the caller keeps its current config.
+    def unusable(reason: str) -> PluginConfig:
+        if not fallback:
+            raise ValueError(reason)
+        server.logger.error(f"Loading config error: {reason}")
+        server.logger.warning(
+            "Fallback to default config, actual config file is keeping."
+        )
+        return PluginConfig()
+
+    config_path: str = get_config_path(server)
+    default_config_dict: dict = get_default_config_dict()
     if not os.path.exists(config_path):
+        if not fallback:
+            raise ValueError("Config file not found")
         server.logger.warning("Config file not found, creating a new one...")
         await save_dict_to_yml(config_path, default_config_dict)
         return PluginConfig()
     server.logger.info("Loading config file...")
-    config_dict: dict = await load_dict_from_yml(config_path)
-    if not config_dict and os.path.exists(config_path):
+    try:
+        config_dict: Any = await load_dict_from_yml(config_path)
+    except Exception as e:
+        return unusable(f"Cannot parse config file: {e}")
+    if not isinstance(config_dict, dict):
+        # Empty, or cut short while it was being saved.
+        if not fallback:
+            raise ValueError(f"Config file holds no options: {config_dict!r}")
         server.logger.error(f"Saved wrong config data: {config_dict}")
-    missing_keys, extra_keys = find_conflict_dict_keys(
-        PluginConfig().model_dump(), config_dict
-    )
+        config_dict = {}
+    missing_keys, extra_keys = find_conflict_dict_keys(default_config_dict, config_dict)
+    if missing_keys and not fallback:
+        # Loading filled them in already, a save cut short usually lost them.
+        raise ValueError(f"Missing keys in config options: {sorted(missing_keys)}")
     config_format_fine: bool = missing_keys == extra_keys == set()
     if missing_keys:
         config_format_fine = False
@@ -97,16 +251,21 @@ async def load_config(server: PluginServerInterface) -> PluginConfig:
         server.logger.warning(
             f"Extra keys in config options: {extra_keys} (will be ignored, but you shouldn't keep them.)"
         )
-    if config_format_fine:
-        return PluginConfig(**config_dict)
-    merged_config_dict: dict = merge_dict(default_config_dict, config_dict)
+    merged_config_dict: dict = (
+        config_dict
+        if config_format_fine
+        else merge_dict(default_config_dict, config_dict)
+    )
     try:
+        # Validation runs off the event loop too, like the YAML parsing.
+        loop: AbstractEventLoop = asyncio.get_running_loop()
+        result: PluginConfig = await loop.run_in_executor(
+            None, PluginConfig.model_validate, merged_config_dict
+        )
+    except Exception as e:
+        return unusable(str(e))
+    if not config_format_fine:
+        # Only a config that validates is written back.
         server.logger.warning("Merging old config with default one in plugin...")
         await save_dict_to_yml(config_path, merged_config_dict)
-        return PluginConfig.model_validate(merged_config_dict, strict=False)
-    except Exception as e:
-        server.logger.error(f"Loading config error: {e}")
-        server.logger.warning(
-            "Fallback to default config, actual config file is keeping."
-        )
-        return PluginConfig()
+    return result
@@ -1,33 +1,76 @@
+import asyncio
+import os
+import time
 from asyncio import AbstractEventLoop, Task
+from functools import partial
+from typing import AsyncIterator, Callable
 
 from mcdreforged.api.all import (
     CommandContext,
     CommandSource,
+    GreedyText,
     PluginServerInterface,
-    QuotableText,
     SimpleCommandBuilder,
 )
 
 from async_rcon import AsyncRconConnection
+from async_rcon.cache import ResponseCache
+from async_rcon.capture import PacketCapture
 from async_rcon.commands import get_command_root_node
-from async_rcon.config import PluginConfig, load_config
-from async_rcon.lock import CustomLock
+from async_rcon.config import (
+    NamedServerConnectInfo,
+    PluginConfig,
+    diff_config,
+    get_config_path,
+    load_config,
+)
+from async_rcon.lock import LockManager
+from async_rcon.metrics import ConnectionMetrics, PrometheusFileExporter
+from async_rcon.multi import MultiServerClient
+from async_rcon.outbox import CommandOutbox
+from async_rcon.pacing import PacingPolicy, create_pacing
+from async_rcon.periodic import PeriodicScheduler
+from async_rcon.pool import RconPool
+from async_rcon.scheduler import CommandScheduler, Priority
+from async_rcon.supervisor import ConnectionSupervisor
+from async_rcon.sync import SyncRconClient, SyncTarget
 from async_rcon.utils import with_lock
+from async_rcon.watch import WatchHub
 
 builder = SimpleCommandBuilder()
 get_node = get_command_root_node
 client: AsyncRconConnection | None = None
+supervisor: ConnectionSupervisor | None = None
+pool: RconPool | None = None
+multi: MultiServerClient | None = None
+scheduler: CommandScheduler | None = None
+periodic: PeriodicScheduler | None = None
+outbox: CommandOutbox | None = None
+watch_hub: WatchHub | None = None
+capture: PacketCapture | None = None
+cache: ResponseCache | None = None
+metrics_registry: dict[str, ConnectionMetrics] = {}
+exporter: PrometheusFileExporter | None = None
 rcon_task: Task | None = None
 rcon_lock: bool = False
 rcon_offline: bool = False
 config: PluginConfig | None = None
-lock: CustomLock | None = None
+lock: LockManager = LockManager()
 loop: AbstractEventLoop | None = None
+plugin_server: PluginServerInterface | None = None
+config_watcher: Task | None = None
+# Seconds since on_load started, reported by the debug connection command.
+startup_times: dict[str, float] = {}
+load_started: float = 0.0
 
 
 async def on_load(server: PluginServerInterface, _prev_module):
-    global rcon_task, config, client, loop
-    builder.arg("command", QuotableText)
+    global rcon_task, config, client, supervisor, pool, multi, cache, loop, exporter
+    global capture
+    global scheduler, periodic, outbox, watch_hub, plugin_server, load_started
+    load_started = time.perf_counter()
+    startup_times.clear()
+    builder.arg("command", GreedyText)
     root_command_node = get_node(server, "arcon")
     server.logger.info(f"Registering command root node: {root_command_node}")
     builder.command(f"{root_command_node} <command>", on_command_node_rcon_command)
@@ -37,87 +80,539 @@ async def on_load(server: PluginServerInterface, _prev_module):
         f"{root_command_node} debug lock status",
         on_command_node_rcon_debug_lock_status,
     )
+    builder.command(f"{root_command_node} stats", on_command_node_rcon_stats)
+    builder.command(
+        f"{root_command_node} debug connection",
+        on_command_node_rcon_debug_connection,
+    )
+    builder.command(
+        f"{root_command_node} debug pacing",
+        on_command_node_rcon_debug_pacing,
+    )
+    builder.command(
+        f"{root_command_node} debug scheduler",
+        on_command_node_rcon_debug_scheduler,
+    )
+    builder.command(
+        f"{root_command_node} debug periodic",
+        on_command_node_rcon_debug_periodic,
+    )
+    builder.command(
+        f"{root_command_node} reload-config", on_command_node_rcon_reload_config
+    )
+    builder.command(f"{root_command_node} queue <command>", on_command_node_rcon_queue)
+    builder.command(
+        f"{root_command_node} debug outbox",
+        on_command_node_rcon_debug_outbox,
+    )
+    builder.command(
+        f"{root_command_node} debug watch",
+        on_command_node_rcon_debug_watch,
+    )
+    builder.command(
+        f"{root_command_node} debug cache",
+        on_command_node_rcon_debug_cache,
+    )
     builder.register(server)
     config = await load_config(server)
-    mcdr_config = server.get_mcdr_config()
     assert config is not None
     loop = server.get_event_loop()
-    client = AsyncRconConnection(
-        address=config.custom_server.host,
-        port=config.custom_server.port,
-        password=config.custom_server.password,
-        logger=server.logger,
-    )
+    plugin_server = server
     if config.use_mcdr_config:
         server.logger.warning(
             "Using MCDR config to connect to the server, custom server connection info will be ignored."
         )
-        client = AsyncRconConnection(
-            address=mcdr_config["rcon"]["address"],
-            port=mcdr_config["rcon"]["port"],
-            password=mcdr_config["rcon"]["password"],
+    address, port, password = get_server_address(server, config)
+    pacing_factory = new_pacing_factory(config)
+    metrics_registry.clear()
+    if config.capture.enabled:
+        capture = PacketCapture(
+            os.path.join(server.get_data_folder(), config.capture.file),
+            max_bytes=int(config.capture.max_size_mb * 2**20),
+            logger=server.logger,
+        )
+        server.logger.warning(f"Capturing rcon traffic to {capture.path}.")
+    client = AsyncRconConnection(
+        address=address,
+        port=port,
+        password=password,
+        logger=server.logger,
+        pipelined=config.pipelined,
+        transport=config.transport,
+        pacing=pacing_factory(),
+        metrics=new_metrics("client"),
+        ready_timeout=config.supervisor.ready_timeout,
+        capture=capture,
+    )
+    supervisor = ConnectionSupervisor(
+        client,
+        keepalive_interval=config.supervisor.keepalive_interval,
+        keepalive_timeout=config.supervisor.keepalive_timeout,
+        connect_timeout=config.supervisor.connect_timeout,
+        backoff_initial=config.supervisor.backoff_initial,
+        backoff_max=config.supervisor.backoff_max,
+        logger=server.logger,
+    )
+    if config.pool.enabled:
+        pool = RconPool(
+            address=address,
+            port=port,
+            password=password,
+            min_size=config.pool.min_size,
+            max_size=config.pool.max_size,
+            logger=server.logger,
+            pipelined=config.pipelined,
+            transport=config.transport,
+            pacing_factory=pacing_factory,
+            metrics=new_metrics("pool"),
+        )
+        if not await pool.start(lazy=config.lazy_connect):
+            server.logger.error("Failed to start rcon pool, please check your config.")
+        elif config.lazy_connect:
+            server.logger.info("Rcon pool will connect on first use.")
+        else:
+            server.logger.info(f"Rcon pool started with {pool.size} connections!")
+    if config.scheduler.enabled:
+        scheduler = CommandScheduler(
+            pool if pool else client,
+            concurrency=scheduler_concurrency(config),
+            max_queued=config.scheduler.max_queued,
+            full_timeout=config.scheduler.full_timeout,
+        )
+    cache = new_cache(config)
+    # Shared recurring polls, one execution per command for all plugins.
+    periodic = PeriodicScheduler(
+        scheduler or pool or client,
+        max_concurrent=config.periodic.max_concurrent,
+        timeout=config.periodic.timeout,
+        spread=config.periodic.spread,
+        logger=server.logger,
+    )
+    periodic.start()
+    if config.outbox.enabled:
+        outbox = CommandOutbox(
+            scheduler or pool or client,
+            max_size=config.outbox.max_size,
+            ttl=config.outbox.ttl,
+            batch_size=config.outbox.batch_size,
+            retry_max=config.outbox.retry_max,
+            path=(
+                os.path.join(server.get_data_folder(), config.outbox.persist_file)
+                if config.outbox.persist_file
+                else None
+            ),
+            logger=server.logger,
+        )
+        await outbox.load()
+        # Flush the backlog as soon as the supervisor reconnects.
+        supervisor.on_ready = outbox.wake
+        outbox.start()
+    if config.servers:
+        multi = MultiServerClient(logger=server.logger)
+        for info in config.servers:
+            multi.add_server(
+                info.name,
+                new_named_target(server, config, info, pacing_factory),
+                info.tags,
+            )
+        started: dict[str, bool] = await multi.start(lazy=config.lazy_connect)
+        if config.lazy_connect:
+            server.logger.info(
+                f"{len(started)} named rcon servers connect on first use."
+            )
+        else:
+            server.logger.info(
+                f"Connected {sum(started.values())}/{len(started)} named rcon servers."
+            )
+    # Deltas of watched queries, polled through periodic, per named server too.
+    watch_hub = WatchHub(periodic, get_named_target, logger=server.logger)
+    if config.metrics.enabled and config.metrics.prometheus_file:
+        exporter = PrometheusFileExporter(
+            metrics_registry,
+            os.path.join(server.get_data_folder(), config.metrics.prometheus_file),
+            interval=config.metrics.prometheus_interval,
             logger=server.logger,
         )
+        exporter.start()
     if client:
-        init_rcon: bool = await start_client()
-        if init_rcon:
+        init_rcon: bool = await start_client(lazy=config.lazy_connect)
+        if config.lazy_connect:
+            server.logger.info("Rcon client will connect on the first command.")
+        elif init_rcon:
             server.logger.info("Rcon client started!")
-        else:
+        elif not rcon_offline:
             server.logger.error(
                 "Failed to start rcon client, maybe it's already running?"
             )
     if rcon_offline:
         server.logger.error(
-            "Cannot connect to rcon server, please check your config file."
+            "Cannot connect to rcon server, please check your config file. "
+            "Retrying in background..."
+        )
+    start_config_watcher()
+    startup_times["load"] = time.perf_counter() - load_started
+    server.logger.info(f"Rcon plugin loaded in {startup_times['load'] * 1000:.0f} ms.")
+
+
+def get_server_address(
+    server: PluginServerInterface, config: PluginConfig
+) -> tuple[str, int, str]:
+    if config.use_mcdr_config:
+        mcdr_config = server.get_mcdr_config()
+        return (
+            mcdr_config["rcon"]["address"],
+            mcdr_config["rcon"]["port"],
+            mcdr_config["rcon"]["password"],
         )
+    info = config.custom_server
+    return info.host, info.port, info.password
+
+
+def new_pacing_factory(config: PluginConfig) -> Callable[[], PacingPolicy]:
+    return partial(create_pacing, **config.pacing.model_dump())
+
+
+def scheduler_concurrency(config: PluginConfig) -> int:
+    # Auto concurrency: one command per connection, or many when pipelined.
+    return config.scheduler.concurrency or (
+        config.pool.max_size if pool else 16 if config.pipelined else 1
+    )
+
+
+def new_cache(config: PluginConfig) -> ResponseCache | None:
+    target = scheduler or pool or client
+    if not config.cache.enabled or not target:
+        return None
+    return ResponseCache(
+        target,
+        rules=config.cache.rules,
+        max_entries=config.cache.max_entries,
+        invalidate_on_write=config.cache.invalidate_on_write,
+    )
+
+
+def new_named_target(
+    server: PluginServerInterface,
+    config: PluginConfig,
+    info: NamedServerConnectInfo,
+    pacing_factory: Callable[[], PacingPolicy],
+) -> AsyncRconConnection | RconPool:
+    if config.pool.enabled:
+        return RconPool(
+            address=info.host,
+            port=info.port,
+            password=info.password,
+            min_size=config.pool.min_size,
+            max_size=config.pool.max_size,
+            logger=server.logger,
+            pipelined=config.pipelined,
+            transport=config.transport,
+            pacing_factory=pacing_factory,
+            metrics=new_metrics(info.name),
+        )
+    return AsyncRconConnection(
+        address=info.host,
+        port=info.port,
+        password=info.password,
+        logger=server.logger,
+        pipelined=config.pipelined,
+        transport=config.transport,
+        pacing=pacing_factory(),
+        metrics=new_metrics(info.name),
+    )
+
+
+def get_sync_client(
+    source: str = "",
+    priority: Priority = Priority.PLUGIN,
+    timeout: float | None = 10.0,
+) -> SyncRconClient:
+    # For blocking plugins running in MCDR's task executor or their own threads.
+    if not loop:
+        raise RuntimeError("Rcon plugin is not loaded yet")
+    return SyncRconClient(
+        loop, current_target, timeout=timeout, priority=priority, source=source
+    )
+
+
+def get_named_target(name: str) -> AsyncRconConnection | RconPool:
+    if not multi:
+        raise KeyError(f"Unknown rcon server: {name}")
+    return multi.get(name)
+
+
+def current_target() -> SyncTarget | None:
+    return cache or scheduler or pool or client
+
+
+def new_metrics(label: str) -> ConnectionMetrics | None:
+    if not config or not config.metrics.enabled:
+        return None
+    metrics_registry[label] = ConnectionMetrics()
+    return metrics_registry[label]
 
 
-async def start_client() -> bool:
-    global rcon_offline, loop
-    if not client or not loop:
+async def start_client(lazy: bool = False) -> bool:
+    # The supervisor keeps reconnecting in the background even when the first
+    # connect fails, rcon_offline only reports how that first attempt went.
+    # Lazy clients connect (once) when the first command needs them.
+    global rcon_offline, rcon_task
+    if not supervisor or not config or rcon_task:
         return False
-    global rcon_task
-    if not rcon_task:
-        rcon_online: bool = await client.connect()
-        if not rcon_online:
-            rcon_offline = True
-            return False
-        else:
-            rcon_offline = False
-            await client.disconnect()
-        rcon_task = loop.create_task(client.connect())
+    rcon_task = supervisor.start(lazy)
+    if lazy:
+        rcon_offline = False
         return True
-    else:
-        return False
+    rcon_offline = not await supervisor.wait_ready(config.supervisor.connect_timeout)
+    return not rcon_offline
 
 
 async def close_client():
-    global loop
-    if not client or not loop:
-        return
     global rcon_task
-    if rcon_task:
-        loop.create_task(client.disconnect())
-        rcon_task.cancel()
-        await rcon_task
-        rcon_task = None
+    if not supervisor:
+        return
+    await supervisor.stop()
+    rcon_task = None
+
+
+# Options baked into objects that live as long as the plugin.
+RELOAD_REQUIRED = (
+    "pipelined",
+    "transport",
+    "pool.",
+    "metrics.",
+    "scheduler.enabled",
+    "periodic.max_concurrent",
+    "outbox.enabled",
+    "outbox.persist_file",
+    "capture.",
+)
+
+
+async def reload_config(server: PluginServerInterface) -> list[str]:
+    global config
+    if not config:
+        return ["Rcon plugin is not loaded yet."]
+    if not await lock.acquire("config.reload", timeout=30.0):
+        return ["Another config reload is still running."]
+    try:
+        try:
+            new_config = await load_config(server, fallback=False)
+        except (OSError, ValueError) as e:
+            server.logger.error(f"Config reload failed: {e}")
+            return [f"Config file not applied, keeping the current config: {e}"]
+        changed: set[str] = diff_config(config, new_config)
+        old_config, config = config, new_config
+        return await apply_config(server, old_config, new_config, changed)
+    finally:
+        lock.release("config.reload")
+
+
+async def apply_config(
+    server: PluginServerInterface,
+    old: PluginConfig,
+    new: PluginConfig,
+    changed: set[str],
+) -> list[str]:
+    # Only connections whose host, port or password changed are re-established,
+    # commands running on the others are left alone.
+    global cache
+    messages: list[str] = []
+    target = get_server_address(server, new)
+    address, port, _ = target
+    if client and (client.address, client.port, client.password) != target:
+        client.address, client.port, client.password = target
+        # Reported as a lost connection, the supervisor reconnects right away.
+        await client.disconnect()
+        messages.append(f"Reconnecting rcon client to {address}:{port}...")
+    if pool and (pool.address, pool.port, pool.password) != target:
+        await pool.retarget(*target)
+        messages.append(
+            f"Rcon pool moved to {address}:{port} ({pool.size} connections)."
+        )
+    if any(key.startswith("pacing.") for key in changed):
+        apply_pacing(new_pacing_factory(new))
+        messages.append("Applied new pacing settings.")
+    if supervisor and any(key.startswith("supervisor.") for key in changed):
+        supervisor.keepalive_interval = new.supervisor.keepalive_interval
+        supervisor.keepalive_timeout = new.supervisor.keepalive_timeout
+        supervisor.connect_timeout = new.supervisor.connect_timeout
+        supervisor.backoff_initial = new.supervisor.backoff_initial
+        supervisor.backoff_max = new.supervisor.backoff_max
+        supervisor.connection.ready_timeout = new.supervisor.ready_timeout
+    if scheduler and any(key.startswith("scheduler.") for key in changed):
+        scheduler.resize(scheduler_concurrency(new))
+        scheduler.max_queued = new.scheduler.max_queued
+        scheduler.full_timeout = new.scheduler.full_timeout
+    if any(key.startswith("cache.") for key in changed):
+        cache = new_cache(new)
+    if periodic:
+        periodic.timeout = new.periodic.timeout
+        periodic.spread = new.periodic.spread
+    if outbox:
+        outbox.max_size = new.outbox.max_size
+        outbox.ttl = new.outbox.ttl
+        outbox.batch_size = new.outbox.batch_size
+        outbox.retry_max = new.outbox.retry_max
+    if "servers" in changed:
+        messages += await apply_servers(server, old, new)
+    restart: list[str] = sorted(
+        key for key in changed if key.startswith(RELOAD_REQUIRED)
+    )
+    if restart:
+        messages.append(f"Reload the plugin to apply: {', '.join(restart)}")
+    if not messages:
+        messages.append("Config reloaded." if changed else "Config unchanged.")
+    # Last, it may cancel the watcher task this runs in.
+    start_config_watcher()
+    return messages
+
+
+def apply_pacing(pacing_factory: Callable[[], PacingPolicy]):
+    # Pacing state is per socket, every connection gets a fresh policy.
+    targets: list[AsyncRconConnection | RconPool] = [t for t in (client, pool) if t]
+    if multi:
+        targets += [multi.get(name) for name in multi.names]
+    for target in targets:
+        if isinstance(target, RconPool):
+            target.pacing_factory = pacing_factory
+            for connection in target.connections:
+                connection.pacing = pacing_factory()
+        else:
+            target.pacing = pacing_factory()
+
+
+async def apply_servers(
+    server: PluginServerInterface, old: PluginConfig, new: PluginConfig
+) -> list[str]:
+    global multi
+    messages: list[str] = []
+    old_servers = {info.name: info for info in old.servers}
+    new_servers = {info.name: info for info in new.servers}
+    if not multi:
+        if not new_servers:
+            return messages
+        multi = MultiServerClient(logger=server.logger)
+    for name in old_servers.keys() - new_servers.keys():
+        if watch_hub:
+            await watch_hub.drop_server(name)
+        await multi.remove_server(name)
+        metrics_registry.pop(name, None)
+        messages.append(f"Removed rcon server {name}.")
+    pacing_factory = new_pacing_factory(new)
+    for name, info in new_servers.items():
+        previous = old_servers.get(name)
+        if previous is None:
+            target = new_named_target(server, new, info, pacing_factory)
+            multi.add_server(name, target, info.tags)
+            if isinstance(target, RconPool):
+                ok = await target.start()
+            else:
+                ok = await target.connect()
+            messages.append(
+                f"Added rcon server {name}."
+                if ok
+                else f"Added rcon server {name}, but cannot connect to it."
+            )
+            continue
+        if (previous.host, previous.port, previous.password) != (
+            info.host,
+            info.port,
+            info.password,
+        ):
+            ok = await multi.retarget(name, info.host, info.port, info.password)
+            messages.append(
+                f"Reconnected rcon server {name} to {info.host}:{info.port}."
+                if ok
+                else f"Cannot connect rcon server {name} to {info.host}:{info.port}."
+            )
+        if previous.tags != info.tags:
+            multi.set_tags(name, info.tags)
+    if not new_servers:
+        await multi.close()
+        multi = None
+    return messages
+
+
+def start_config_watcher():
+    # Starts or stops the watcher to match config.reload.watch.
+    global config_watcher
+    if config and config.reload.watch and plugin_server:
+        if config_watcher is None or config_watcher.done():
+            config_watcher = asyncio.create_task(watch_config(plugin_server))
+    elif config_watcher:
+        config_watcher.cancel()
+        config_watcher = None
+
+
+async def watch_config(server: PluginServerInterface):
+    # Polls the modification time, works on every filesystem and costs one stat.
+    path: str = get_config_path(server)
+    last = await get_mtime(path)
+    while config and config.reload.watch:
+        await asyncio.sleep(config.reload.interval)
+        current = await get_mtime(path)
+        if current == last:
+            continue
+        server.logger.info("Config file changed, reloading...")
+        try:
+            for line in await reload_config(server):
+                server.logger.info(line)
+        except Exception as e:
+            # One bad save or failed apply must not stop the watcher.
+            server.logger.error(f"Config reload failed: {e!r}")
+        # Loading may have rewritten the file with merged defaults.
+        last = await get_mtime(path)
+
+
+async def get_mtime(path: str) -> int | None:
+    import aiofiles.os
+
+    try:
+        return (await aiofiles.os.stat(path)).st_mtime_ns
+    except OSError:
+        return None
 
 
 async def on_unload(server: PluginServerInterface):
-    global rcon_task
+    global rcon_task, pool, multi, exporter, periodic, outbox, watch_hub
+    global config_watcher, capture
+    if config_watcher:
+        config_watcher.cancel()
+        config_watcher = None
+    if watch_hub:
+        await watch_hub.stop()
+        watch_hub = None
+    if periodic:
+        await periodic.stop()
+        periodic = None
+    if outbox:
+        # Whatever is still queued stays in the journal for the next load.
+        await outbox.stop()
+        outbox = None
     await close_client()
-    if rcon_task:
-        rcon_task.cancel()
-        await rcon_task
-        rcon_task = None
+    if capture:
+        await capture.close()
+        capture = None
+    if exporter:
+        await exporter.stop()
+        exporter = None
+    if pool:
+        await pool.close()
+        pool = None
+    if multi:
+        await multi.close()
+        multi = None
 
 
 async def on_command_node_rcon_command(src: CommandSource, ctx: CommandContext):
+    if ctx["command"].startswith("@"):
+        await run_routed_command(src, ctx["command"])
+        return
     if not client:
         src.reply("Rcon error: client is not initialized!")
         return
     rcon_status: bool | None = None
-    response: str | None = None
     if not rcon_task:
         if rcon_lock:
             src.reply("Rcon client need restart manually! Use @rcon connect")
@@ -132,8 +627,68 @@ async def on_command_node_rcon_command(src: CommandSource, ctx: CommandContext):
                 "You can restart rcon client manually by @rcon connect. Then retry query commands."
             )
             return
-    response = await client.send_command(ctx["command"])
-    src.reply(f"[Response] \n{response}\n")
+    target: AsyncRconConnection | RconPool = client
+    if pool and pool.size > 0:
+        target = pool
+    if cache:
+        cache.observe(ctx["command"])
+    fragments: AsyncIterator[str]
+    if scheduler:
+        # Admin commands jump ahead of queued plugin and background traffic.
+        fragments = scheduler.stream_command(
+            ctx["command"],
+            priority=Priority.INTERACTIVE,
+            source="interactive",
+            timeout=config.command_timeout if config else None,
+        )
+    else:
+        fragments = target.stream_command(
+            ctx["command"], timeout=config.command_timeout if config else None
+        )
+    src.reply("[Response] ")
+    try:
+        await reply_stream(src, fragments)
+    except TimeoutError:
+        src.reply("Rcon error: command timed out!")
+    except Exception as e:
+        src.reply(f"Rcon error: {e}")
+
+
+async def run_routed_command(src: CommandSource, text: str):
+    # "@<server|tag> <command>", runs on every matching named server at once.
+    target, _, command = text[1:].partition(" ")
+    if not multi:
+        src.reply("Rcon error: no named servers in config!")
+        return
+    if not target or not command:
+        src.reply("Usage: @rcon @<server|tag> <command>")
+        return
+    if not multi.select(target):
+        src.reply(f"Rcon error: no server or tag named {target}!")
+        return
+    async for name, response in multi.broadcast(command, target=target):
+        if response is None:
+            src.reply(f"[{name}] Failed or timed out.")
+        else:
+            src.reply(f"[{name}] {response}")
+
+
+async def reply_stream(
+    src: CommandSource, fragments: AsyncIterator[str], flush_size: int = 4096
+):
+    # Reply whole lines as soon as they arrive, long lines are cut at flush_size.
+    buffer: str = ""
+    async for text in fragments:
+        buffer += text
+        end: int = buffer.rfind("\n")
+        if end >= 0:
+            src.reply(buffer[:end])
+            buffer = buffer[end + 1 :]
+        elif len(buffer) >= flush_size:
+            src.reply(buffer)
+            buffer = ""
+    if buffer:
+        src.reply(buffer)
 
 
 @with_lock(lock, "client_option.disconnect")
@@ -153,14 +708,114 @@ async def on_command_node_rcon_connect(src: CommandSource, ctx: CommandContext):
         if not rcon_offline:
             src.reply("Rcon client is maybe already running!")
         else:
-            src.reply("Rcon server is offline, please check your config!")
+            src.reply(
+                "Rcon server is offline, please check your config! Retrying in background..."
+            )
 
 
 async def on_command_node_rcon_debug_lock_status(
     src: CommandSource, ctx: CommandContext
 ):
-    if lock:
-        if lock.block:
-            src.reply(f"Locking: {lock.id}")
-            return
-    src.reply("Not locking.")
+    held: list[str] = lock.held()
+    if held:
+        src.reply(f"Locking: {', '.join(held)}")
+    else:
+        src.reply("Not locking.")
+    src.reply(", ".join(f"{key}: {value:g}" for key, value in lock.stats().items()))
+
+
+async def on_command_node_rcon_debug_connection(
+    src: CommandSource, ctx: CommandContext
+):
+    if not supervisor:
+        src.reply("Rcon client is not initialized.")
+        return
+    src.reply(f"Client connection: {supervisor.describe()}")
+    if capture:
+        src.reply(f"Capture: {capture.describe()}")
+    if supervisor.ready_at is not None:
+        startup_times["ready"] = supervisor.ready_at - load_started
+    src.reply(
+        "Startup: "
+        + ", ".join(
+            f"{key} {value * 1000:.0f} ms" for key, value in startup_times.items()
+        )
+    )
+
+
+async def on_command_node_rcon_debug_pacing(src: CommandSource, ctx: CommandContext):
+    if client:
+        src.reply(f"Client pacing: {client.pacing.describe()}")
+    if pool:
+        for index, connection in enumerate(pool.connections):
+            src.reply(
+                f"Pool connection #{index} pacing: {connection.pacing.describe()}"
+            )
+
+
+async def on_command_node_rcon_debug_cache(src: CommandSource, ctx: CommandContext):
+    if not cache:
+        src.reply("Response cache is disabled.")
+        return
+    src.reply(", ".join(f"{key}: {value}" for key, value in cache.stats().items()))
+
+
+async def on_command_node_rcon_stats(src: CommandSource, ctx: CommandContext):
+    if not metrics_registry:
+        src.reply("Metrics are disabled.")
+        return
+    for label, metrics in metrics_registry.items():
+        src.reply(f"[{label}]")
+        for line in metrics.describe():
+            src.reply(f"  {line}")
+
+
+async def on_command_node_rcon_debug_scheduler(src: CommandSource, ctx: CommandContext):
+    if not scheduler:
+        src.reply("Command scheduler is disabled.")
+        return
+    for line in scheduler.describe():
+        src.reply(line)
+
+
+async def on_command_node_rcon_debug_periodic(src: CommandSource, ctx: CommandContext):
+    if not periodic:
+        src.reply("Periodic scheduler is not initialized.")
+        return
+    for line in periodic.describe():
+        src.reply(line)
+
+
+async def on_command_node_rcon_queue(src: CommandSource, ctx: CommandContext):
+    if not outbox:
+        src.reply("Rcon outbox is disabled.")
+        return
+    response: str | None = await outbox.send(ctx["command"])
+    if response is None:
+        src.reply(f"Rcon server unreachable, queued ({len(outbox)} waiting).")
+    else:
+        src.reply(f"[Response] {response}")
+
+
+async def on_command_node_rcon_debug_outbox(src: CommandSource, ctx: CommandContext):
+    if not outbox:
+        src.reply("Rcon outbox is disabled.")
+        return
+    for line in outbox.describe():
+        src.reply(line)
+
+
+async def on_command_node_rcon_debug_watch(src: CommandSource, ctx: CommandContext):
+    if not watch_hub:
+        src.reply("Watch hub is not initialized.")
+        return
+    for line in watch_hub.describe():
+        src.reply(line)
+
+
+async def on_command_node_rcon_reload_config(src: CommandSource, ctx: CommandContext):
+    if not plugin_server:
+        src.reply("Rcon plugin is not loaded yet.")
+        return
+    for line in await reload_config(plugin_server):
+        src.reply(line)
@@ -0,0 +1,333 @@
+import argparse
+import asyncio
+import contextlib
+import logging
+import time
+from logging import Logger
+from typing import Optional, get_args
+
+from async_rcon.codec import (
+    RawPacket,
+    RconCodec,
+    _PacketType,
+    _RequestId,
+    encode_raw_packet_into,
+)
+from async_rcon.metrics import Histogram
+from async_rcon.pacing import PacingMode, create_pacing
+from async_rcon.pool import RconPool
+from async_rcon.scheduler import CommandScheduler
+from async_rcon.transport import TransportMode, install_uvloop
+
+# Same fragment size as vanilla, some clients rely on it to detect the last one.
+FRAGMENT_SIZE = 4096
+# Body of the response to a command the upstream connection failed to run.
+FAILURE_PREFIX = "Rcon gateway error: "
+
+
+class GatewayClient:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.closed: bool = False
+        self.commands: int = 0
+        self.failed_commands: int = 0
+        self.bytes_in: int = 0
+        self.bytes_out: int = 0
+        self.latency = Histogram()
+
+    def describe(self) -> str:
+        state = " (closed)" if self.closed else ""
+        return (
+            f"{self.name}{state}: {self.commands} commands "
+            f"({self.failed_commands} failed), "
+            f"p99 <= {self.latency.quantile(0.99) * 1000:g} ms, "
+            f"in {self.bytes_in} bytes, out {self.bytes_out} bytes"
+        )
+
+
+class _GatewaySession:
+    # Responses are written in request order, like a vanilla server would.
+    MAX_OUTSTANDING = 64
+
+    def __init__(
+        self,
+        gateway: "RconGateway",
+        client: GatewayClient,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        self.gateway = gateway
+        self.client = client
+        self.reader = reader
+        self.writer = writer
+        self.authenticated: bool = False
+        self._codec = RconCodec()
+        self._outgoing: asyncio.Queue[asyncio.Future[bytes]] = asyncio.Queue(
+            self.MAX_OUTSTANDING
+        )
+        self._commands: set[asyncio.Task] = set()
+
+    async def run(self):
+        flush_task = asyncio.create_task(self.__flush_loop())
+        try:
+            while data := await self.reader.read(2**16):
+                self.client.bytes_in += len(data)
+                self._codec.receive_data(data)
+                while (packet := self._codec.next_raw_packet()) is not None:
+                    # Blocks the reader when the client runs too far ahead.
+                    await self._outgoing.put(self.__handle(packet))
+            await self._outgoing.join()
+        except ConnectionError:
+            pass
+        finally:
+            for task in list(self._commands):
+                task.cancel()
+            flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, ConnectionError):
+                await flush_task
+            self.writer.close()
+            with contextlib.suppress(ConnectionError):
+                await self.writer.wait_closed()
+
+    def __handle(self, packet: RawPacket) -> asyncio.Future[bytes]:
+        loop = asyncio.get_running_loop()
+        if packet.packet_type == _PacketType.LOGIN_REQUEST:
+            self.authenticated = (
+                packet.body.decode("utf8", "replace") == self.gateway.password
+            )
+            request_id = (
+                packet.request_id if self.authenticated else _RequestId.LOGIN_FAIL
+            )
+            return self.__ready(request_id, _PacketType.AUTH_RESPONSE, b"")
+        if not self.authenticated:
+            return self.__ready(_RequestId.LOGIN_FAIL, _PacketType.AUTH_RESPONSE, b"")
+        if packet.packet_type != _PacketType.COMMAND_REQUEST:
+            # Includes the ending packets clients use to find the end of a response.
+            return self.__ready(
+                packet.request_id,
+                _PacketType.COMMAND_RESPONSE,
+                f"Unknown request {hex(packet.packet_type)[2:]}".encode("utf8"),
+            )
+        task = loop.create_task(self.__execute(packet))
+        self._commands.add(task)
+        task.add_done_callback(self._commands.discard)
+        return task
+
+    def __ready(self, request_id: int, packet_type: int, body: bytes):
+        future: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+        future.set_result(self.__encode(request_id, packet_type, body))
+        return future
+
+    def __encode(self, request_id: int, packet_type: int, body: bytes) -> bytes:
+        buffer = bytearray()
+        for i in range(0, len(body), FRAGMENT_SIZE):
+            encode_raw_packet_into(
+                buffer, request_id, packet_type, body[i : i + FRAGMENT_SIZE]
+            )
+        if not body:
+            encode_raw_packet_into(buffer, request_id, packet_type, b"")
+        return bytes(buffer)
+
+    async def __execute(self, packet: RawPacket) -> bytes:
+        # The upstream connection assigns its own request IDs, the downstream
+        # ID is only put back on the response here.
+        client = self.client
+        started = time.perf_counter()
+        reason = "no answer from the server"
+        try:
+            result = await self.gateway.scheduler.send_command(
+                packet.body.decode("utf8", "replace"),
+                source=client.name,
+                timeout=self.gateway.timeout,
+            )
+        except Exception as e:
+            if self.gateway.logger:
+                self.gateway.logger.warning(
+                    f"Gateway command from {client.name}: {e!r}"
+                )
+            result = None
+            reason = "timed out" if isinstance(e, TimeoutError) else repr(e)
+        client.commands += 1
+        if result is None:
+            # An empty response would pass for a command without output.
+            client.failed_commands += 1
+            result = f"{FAILURE_PREFIX}{reason}"
+        else:
+            client.latency.observe(time.perf_counter() - started)
+        return self.__encode(
+            packet.request_id, _PacketType.COMMAND_RESPONSE, result.encode("utf8")
+        )
+
+    async def __flush_loop(self):
+        while True:
+            response = await self._outgoing.get()
+            try:
+                data = await response
+            except asyncio.CancelledError:
+                if not response.cancelled():
+                    raise
+                data = b""
+            if data:
+                self.writer.write(data)
+                await self.writer.drain()
+                self.client.bytes_out += len(data)
+            self._outgoing.task_done()
+
+
+class RconGateway:
+    def __init__(
+        self,
+        upstream: RconPool,
+        *,
+        password: str,
+        timeout: Optional[float] = 30.0,
+        logger: Optional[Logger] = None,
+    ):
+        self.upstream = upstream
+        # Per downstream client fairness comes from the scheduler sources.
+        self.scheduler = CommandScheduler(
+            upstream,
+            concurrency=upstream.max_size * (16 if upstream.pipelined else 1),
+        )
+        self.password = password
+        self.timeout = timeout
+        self.logger = logger
+        self.clients: dict[str, GatewayClient] = {}
+        self._servers: list[asyncio.AbstractServer] = []
+        self._sessions: set[asyncio.Task] = set()
+        self._anonymous: int = 0
+
+    async def start(
+        self,
+        host: Optional[str] = "127.0.0.1",
+        port: Optional[int] = 25576,
+        unix_path: Optional[str] = None,
+    ) -> bool:
+        if not await self.upstream.start():
+            return False
+        if unix_path:
+            self._servers.append(
+                await asyncio.start_unix_server(self.__accept, unix_path)
+            )
+        if port is not None:
+            self._servers.append(await asyncio.start_server(self.__accept, host, port))
+        return True
+
+    async def close(self):
+        servers, self._servers = self._servers, []
+        for server in servers:
+            server.close()
+        for task in list(self._sessions):
+            task.cancel()
+        await asyncio.gather(*self._sessions, return_exceptions=True)
+        for server in servers:
+            await server.wait_closed()
+        await self.upstream.close()
+
+    @property
+    def addresses(self) -> list[str]:
+        return [
+            str(socket.getsockname())
+            for server in self._servers
+            for socket in server.sockets
+        ]
+
+    def report(self) -> list[str]:
+        # Closed clients are reported one last time, then forgotten.
+        lines = [client.describe() for client in self.clients.values()]
+        for name in [name for name, c in self.clients.items() if c.closed]:
+            del self.clients[name]
+        return lines
+
+    def __client_for(self, writer: asyncio.StreamWriter) -> GatewayClient:
+        # One client per connection, tools on the same host are served and
+        # accounted separately.
+        peer = writer.get_extra_info("peername")
+        if isinstance(peer, tuple):
+            name = f"{peer[0]}:{peer[1]}"
+        else:
+            self._anonymous += 1
+            name = f"unix#{self._anonymous}"
+        client = self.clients[name] = GatewayClient(name)
+        return client
+
+    async def __accept(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        task = asyncio.current_task()
+        assert task is not None
+        self._sessions.add(task)
+        client = self.__client_for(writer)
+        try:
+            await _GatewaySession(self, client, reader, writer).run()
+        except asyncio.CancelledError:
+            pass  # Gateway is closing.
+        finally:
+            client.closed = True
+            self._sessions.discard(task)
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Share one upstream RCON session between many local clients."
+    )
+    parser.add_argument("upstream", help="Upstream RCON server, host:port")
+    parser.add_argument("--password", required=True, help="Upstream RCON password")
+    parser.add_argument("--listen-host", default="127.0.0.1")
+    parser.add_argument("--listen-port", type=int, default=25576)
+    parser.add_argument("--unix", help="Also listen on this Unix socket path")
+    parser.add_argument("--no-tcp", action="store_true")
+    parser.add_argument(
+        "--gateway-password",
+        help="Password downstream clients log in with, defaults to the upstream one",
+    )
+    parser.add_argument("--connections", type=int, default=1)
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument("--pacing", choices=get_args(PacingMode), default="fixed")
+    parser.add_argument(
+        "--transport", choices=get_args(TransportMode), default="protocol"
+    )
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--report-interval", type=float, default=60.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    logger = logging.getLogger("async_rcon.gateway")
+    host, _, port = args.upstream.rpartition(":")
+    upstream = RconPool(
+        host,
+        int(port),
+        args.password,
+        min_size=1,
+        max_size=args.connections,
+        logger=logger,
+        pipelined=args.pipelined,
+        pacing_factory=lambda: create_pacing(args.pacing),
+        transport=args.transport,
+    )
+    gateway = RconGateway(
+        upstream,
+        password=args.gateway_password or args.password,
+        timeout=args.timeout,
+        logger=logger,
+    )
+    if not await gateway.start(
+        args.listen_host, None if args.no_tcp else args.listen_port, args.unix
+    ):
+        logger.error(f"Cannot connect to upstream RCON server {args.upstream}")
+        return
+    logger.info(f"RCON gateway listening on {', '.join(gateway.addresses)}")
+    try:
+        while True:
+            await asyncio.sleep(args.report_interval)
+            for line in gateway.report():
+                logger.info(line)
+    finally:
+        for line in gateway.report():
+            logger.info(line)
+        await gateway.close()
+
+
+if __name__ == "__main__":
+    install_uvloop()
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(main())
@@ -1,100 +1,269 @@
 import asyncio
+import itertools
+import threading
 import time
+from collections import deque
 from typing import Optional
 
+from async_rcon.metrics import Histogram
 
-class CustomLock:
-    def __init__(self, block: bool, id: Optional[str | list[str]] = None) -> None:
-        self.block: bool = block
-        self.id: list[str] = []
-        if not id:
-            return
-        match id:
-            case id if isinstance(id, str):
-                self.id.append(id)
-            case id if isinstance(id, list):
-                for i in id:
-                    if i not in self.id:
-                        self.id.append(i)
-        self._condition = asyncio.Condition()
-        self._last_add_time: float | None = None
-
-    def add(self, id: str | list[str], rate_limit: float = 0.01) -> bool:
-        _current_time = time.monotonic()
-        if self._last_add_time:
-            if _current_time - self._last_add_time < rate_limit:
-                return False
-        self._last_add_time = _current_time
-        match id:
-            case id if isinstance(id, list):
-                if self.id != []:
-                    for i in id:
-                        if i not in self.id:
-                            self.id.append(i)
-                else:
-                    self.id = id
-            case id if isinstance(id, str):
-                if id not in self.id:
-                    self.id.append(id)
-        return True
 
-    async def add_async(
-        self, id: str | list[str], rate_limit: float = 0.1, retry: bool = True
-    ) -> bool:
-        result: bool = self.add(id, rate_limit)
-        if not result:
-            await asyncio.sleep(rate_limit)
-            result: bool = self.add(id, rate_limit)
-        return result
-
-    def remove(self, id: str | list[str]):
-        if self.id == []:
-            return
-        match id:
-            case id if isinstance(id, list):
-                for i in id:
-                    if i in self.id:
-                        self.id.remove(i)
-            case id if isinstance(id, str):
-                if id in self.id:
-                    self.id.remove(id)
-
-    def unlock(self):
-        self.block = False
-        asyncio.create_task(self._notify_all())
-
-    def lock(self):
-        self.block = True
-
-    async def _notify_all(self):
-        async with self._condition:
-            self._condition.notify_all()
-
-    async def wait_for_lock_release_async(
-        self, option_id: str, timeout: float = 5.0
-    ) -> bool:
+class _LockNode:
+    def __init__(self, parent: Optional["_LockNode"], name: str) -> None:
+        self.parent = parent
+        self.name = name
+        self.children: dict[str, _LockNode] = {}
+        self.held: bool = False
+        # Held IDs and queued waiters in the subtree below this node.
+        self.held_below: int = 0
+        self.waiting_below: int = 0
+        self.waiters: deque[_LockWaiter] = deque()
+
+    def ancestors(self):
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+
+class _LockWaiter:
+    def __init__(
+        self,
+        node: _LockNode,
+        sequence: int,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        self.node = node
+        self.sequence = sequence
+        self.enqueued = time.perf_counter()
+        # Only ever read or written under the manager mutex.
+        self.granted: bool = False
+        self.loop = loop
+        self.future: Optional[asyncio.Future] = loop.create_future() if loop else None
+        self.event: Optional[threading.Event] = None if loop else threading.Event()
+
+    def wake(self):
+        # May run on any thread, the future is resolved on its own loop.
+        if self.event is not None:
+            self.event.set()
+        elif self.loop is not None:
+            self.loop.call_soon_threadsafe(self.__resolve)
+
+    def __resolve(self):
+        if self.future is not None and not self.future.done():
+            self.future.set_result(None)
+
+
+class LockManager:
+    # Dotted option IDs form a tree: "client_option" conflicts with
+    # "client_option.connect", which does not conflict with
+    # "client_option.disconnect". Safe to use from the event loop and from
+    # other threads at the same time.
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._root = _LockNode(None, "")
+        self._sequence = itertools.count()
+        self.acquired: int = 0
+        self.contended: int = 0
+        self.timeouts: int = 0
+        self.wait_time = Histogram()
+
+    def locked(self, option_id: str) -> bool:
+        with self._mutex:
+            node = self.__node(option_id)
+            result = not self.__available(node)
+            self.__prune(node)
+            return result
+
+    def try_acquire(self, option_id: str) -> bool:
+        with self._mutex:
+            node = self.__node(option_id)
+            if self.__free(node):
+                self.__take(node, 0.0)
+                return True
+            self.__prune(node)
+            return False
+
+    async def acquire(self, option_id: str, timeout: Optional[float] = None) -> bool:
+        with self._mutex:
+            node = self.__node(option_id)
+            if self.__free(node):
+                self.__take(node, 0.0)
+                return True
+            waiter = _LockWaiter(node, next(self._sequence), asyncio.get_running_loop())
+            self.__enqueue(waiter)
+        assert waiter.future is not None
         try:
             async with asyncio.timeout(timeout):
-                async with self._condition:
-                    await self._condition.wait_for(
-                        lambda: not self.block
-                        or not (
-                            option_id in self.id
-                            or any(i.startswith(f"{option_id}.") for i in self.id)
-                        )
-                    )
-                return True
+                await waiter.future
         except TimeoutError:
+            return self.__abandon(waiter, timed_out=True)
+        except asyncio.CancelledError:
+            if self.__abandon(waiter, timed_out=False):
+                self.release(option_id)
+            raise
+        return True
+
+    def acquire_sync(self, option_id: str, timeout: Optional[float] = None) -> bool:
+        # Blocks the calling thread only, never call it on the event loop thread.
+        with self._mutex:
+            node = self.__node(option_id)
+            if self.__free(node):
+                self.__take(node, 0.0)
+                return True
+            waiter = _LockWaiter(node, next(self._sequence))
+            self.__enqueue(waiter)
+        assert waiter.event is not None
+        return waiter.event.wait(timeout) or self.__abandon(waiter, timed_out=True)
+
+    def release(self, option_id: str):
+        with self._mutex:
+            node = self.__find(option_id)
+            if node is None or not node.held:
+                raise RuntimeError(f"Lock {option_id!r} is not acquired")
+            node.held = False
+            for ancestor in node.ancestors():
+                ancestor.held_below -= 1
+            self.__grant(node)
+            self.__prune(node)
+
+    def held(self) -> list[str]:
+        with self._mutex:
+            result: list[str] = []
+            stack: list[tuple[_LockNode, str]] = [(self._root, "")]
+            while stack:
+                node, path = stack.pop()
+                if node.held:
+                    result.append(path)
+                if node.held or node.held_below:
+                    for name, child in node.children.items():
+                        stack.append((child, f"{path}.{name}" if path else name))
+            return sorted(result)
+
+    @property
+    def waiting(self) -> int:
+        return self._root.waiting_below + len(self._root.waiters)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "held": self._root.held_below,
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "timeouts": self.timeouts,
+            "wait_p99": self.wait_time.quantile(0.99),
+        }
+
+    def __find(self, option_id: str) -> Optional[_LockNode]:
+        node = self._root
+        for name in option_id.split("."):
+            child = node.children.get(name)
+            if child is None:
+                return None
+            node = child
+        return node
+
+    def __node(self, option_id: str) -> _LockNode:
+        node = self._root
+        for name in option_id.split("."):
+            child = node.children.get(name)
+            if child is None:
+                child = node.children[name] = _LockNode(node, name)
+            node = child
+        return node
+
+    def __available(self, node: _LockNode) -> bool:
+        if node.held or node.held_below:
             return False
+        return not any(ancestor.held for ancestor in node.ancestors())
+
+    def __free(self, node: _LockNode) -> bool:
+        # Available and nobody queued first on the ID or on an ancestor.
+        return (
+            self.__available(node)
+            and not node.waiters
+            and not self.__queued_above(node)
+        )
 
-    def wait_for_lock_release(self, option_id: str, timeout: float = 5.0) -> bool:
-        condition: bool = not self.block or not (
-            option_id in self.id or any(i.startswith(f"{option_id}.") for i in self.id)
+    def __queued_above(self, node: _LockNode, sequence: Optional[int] = None) -> bool:
+        # Waiters on an ancestor that arrived earlier go first, otherwise a
+        # stream of child acquisitions could starve them.
+        return any(
+            ancestor.waiters
+            and (sequence is None or ancestor.waiters[0].sequence < sequence)
+            for ancestor in node.ancestors()
         )
-        if condition:
-            return True
-        else:
-            time.sleep(timeout)
-            if condition:
+
+    def __take(self, node: _LockNode, waited: float):
+        node.held = True
+        for ancestor in node.ancestors():
+            ancestor.held_below += 1
+        self.acquired += 1
+        self.wait_time.observe(waited)
+
+    def __enqueue(self, waiter: _LockWaiter):
+        waiter.node.waiters.append(waiter)
+        for ancestor in waiter.node.ancestors():
+            ancestor.waiting_below += 1
+        self.contended += 1
+
+    def __dequeue(self, waiter: _LockWaiter):
+        waiter.node.waiters.remove(waiter)
+        for ancestor in waiter.node.ancestors():
+            ancestor.waiting_below -= 1
+
+    def __abandon(self, waiter: _LockWaiter, timed_out: bool) -> bool:
+        # True when the lock was granted right as the wait gave up.
+        with self._mutex:
+            if waiter.granted:
                 return True
-        return False
+            if timed_out:
+                self.timeouts += 1
+            self.__dequeue(waiter)
+            # Waiters below may have queued only because this one was first.
+            self.__grant(waiter.node)
+            self.__prune(waiter.node)
+            return False
+
+    def __grant(self, released: _LockNode):
+        # Only waiters on the released ID, its ancestors or its subtree can
+        # have been blocked by it. They are served in arrival order.
+        candidates = list(released.waiters)
+        for ancestor in released.ancestors():
+            candidates.extend(ancestor.waiters)
+        stack = [
+            child for child in released.children.values() if self.__has_waiters(child)
+        ]
+        while stack:
+            node = stack.pop()
+            candidates.extend(node.waiters)
+            stack.extend(
+                child for child in node.children.values() if self.__has_waiters(child)
+            )
+        now = time.perf_counter()
+        for waiter in sorted(candidates, key=lambda w: w.sequence):
+            if (
+                waiter.node.waiters[0] is waiter
+                and self.__available(waiter.node)
+                and not self.__queued_above(waiter.node, waiter.sequence)
+            ):
+                self.__dequeue(waiter)
+                self.__take(waiter.node, now - waiter.enqueued)
+                waiter.granted = True
+                waiter.wake()
+
+    def __has_waiters(self, node: _LockNode) -> bool:
+        return bool(node.waiters) or node.waiting_below > 0
+
+    def __prune(self, node: _LockNode):
+        # Drop nodes nobody holds or waits for, so the tree stays small.
+        while (
+            node.parent is not None
+            and not node.held
+            and not node.held_below
+            and not node.waiters
+            and not node.waiting_below
+            and not node.children
+        ):
+            del node.parent.children[node.name]
+            node = node.parent
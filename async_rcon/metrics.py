@@ -0,0 +1,221 @@
+import asyncio
+import bisect
+import math
+import os
+import time
+from logging import Logger
+from typing import Optional
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+FRAGMENT_BUCKETS = (1, 2, 4, 8, 16, 64, 256, 1024)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets: tuple[float, ...] = buckets
+        # The last slot counts values above the largest bucket (+Inf).
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the quantile, good enough for a summary.
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+class _TimedLock:
+    def __init__(self, lock: asyncio.Lock, histogram: Histogram) -> None:
+        self.lock = lock
+        self.histogram = histogram
+
+    async def __aenter__(self):
+        started = time.perf_counter()
+        await self.lock.acquire()
+        self.histogram.observe(time.perf_counter() - started)
+
+    async def __aexit__(self, *exc_info):
+        self.lock.release()
+
+
+class ConnectionMetrics:
+    # Connections only call into this when metrics are enabled, see AsyncRconConnection.
+    COUNTERS = (
+        "commands",
+        "failed_commands",
+        "batches",
+        "retries",
+        "connects",
+        "reconnects",
+        "connect_failures",
+        "bytes_out",
+        "bytes_in",
+        "packets_out",
+        "packets_in",
+    )
+    HISTOGRAMS = {
+        "command_latency_seconds": "command_latency",
+        "lock_wait_seconds": "lock_wait",
+        "connect_duration_seconds": "connect_duration",
+        "login_duration_seconds": "login_duration",
+        "fragments_per_response": "fragments",
+    }
+
+    def __init__(self) -> None:
+        self.command_latency = Histogram()
+        self.lock_wait = Histogram()
+        self.connect_duration = Histogram()
+        self.login_duration = Histogram()
+        self.fragments = Histogram(FRAGMENT_BUCKETS)
+        self.pacing_sleep: float = 0.0
+        self.commands: int = 0
+        self.failed_commands: int = 0
+        self.batches: int = 0
+        self.retries: int = 0
+        self.connects: int = 0
+        self.reconnects: int = 0
+        self.connect_failures: int = 0
+        self.bytes_out: int = 0
+        self.bytes_in: int = 0
+        self.packets_out: int = 0
+        self.packets_in: int = 0
+
+    def timed(self, lock: asyncio.Lock) -> _TimedLock:
+        return _TimedLock(lock, self.lock_wait)
+
+    def histograms(self) -> dict[str, Histogram]:
+        return {name: getattr(self, attr) for name, attr in self.HISTOGRAMS.items()}
+
+    def snapshot(self) -> dict[str, object]:
+        result: dict[str, object] = {
+            name: getattr(self, name) for name in self.COUNTERS
+        }
+        result["pacing_sleep_seconds"] = self.pacing_sleep
+        for name, histogram in self.histograms().items():
+            result[name] = histogram.snapshot()
+        return result
+
+    def describe(self) -> list[str]:
+        latency = self.command_latency
+        return [
+            f"commands {self.commands} ({self.failed_commands} failed, "
+            f"{self.retries} retries, {self.batches} batches)",
+            f"latency p50 <= {latency.quantile(0.5) * 1000:g} ms, "
+            f"p99 <= {latency.quantile(0.99) * 1000:g} ms, "
+            f"lock wait {self.lock_wait.sum * 1000:.1f} ms, "
+            f"pacing sleep {self.pacing_sleep * 1000:.1f} ms",
+            f"out {self.packets_out} packets / {self.bytes_out} bytes, "
+            f"in {self.packets_in} packets / {self.bytes_in} bytes",
+            f"connects {self.connects} ({self.reconnects} reconnects, "
+            f"{self.connect_failures} failed)",
+        ]
+
+
+def to_prometheus(metrics: dict[str, ConnectionMetrics], prefix: str = "rcon") -> str:
+    lines: list[str] = []
+    for name in ConnectionMetrics.COUNTERS:
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        for label, item in metrics.items():
+            lines.append(
+                f'{prefix}_{name}_total{{connection="{label}"}} {getattr(item, name)}'
+            )
+    lines.append(f"# TYPE {prefix}_pacing_sleep_seconds_total counter")
+    for label, item in metrics.items():
+        lines.append(
+            f'{prefix}_pacing_sleep_seconds_total{{connection="{label}"}} '
+            f"{item.pacing_sleep}"
+        )
+    for histogram_name, attr in ConnectionMetrics.HISTOGRAMS.items():
+        metric = f"{prefix}_{histogram_name}"
+        lines.append(f"# TYPE {metric} histogram")
+        for label, item in metrics.items():
+            histogram: Histogram = getattr(item, attr)
+            cumulative = 0
+            for bound, count in zip(
+                (*histogram.buckets, "+Inf"), histogram.counts, strict=True
+            ):
+                cumulative += count
+                lines.append(
+                    f'{metric}_bucket{{connection="{label}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{metric}_sum{{connection="{label}"}} {histogram.sum}')
+            lines.append(f'{metric}_count{{connection="{label}"}} {histogram.count}')
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusFileExporter:
+    def __init__(
+        self,
+        metrics: dict[str, ConnectionMetrics],
+        path: str,
+        *,
+        interval: float = 15.0,
+        logger: Optional[Logger] = None,
+    ):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.logger = logger
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def write(self, text: Optional[str] = None):
+        # Write then rename, so scrapers never read a half written file.
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf8") as f:
+            f.write(text if text is not None else to_prometheus(self.metrics))
+        os.replace(temp_path, self.path)
+
+    async def __run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                text = to_prometheus(self.metrics)
+                await loop.run_in_executor(None, self.write, text)
+            except OSError as e:
+                if self.logger:
+                    self.logger.warning(f"Writing rcon metrics failed: {e}")
+            await asyncio.sleep(self.interval)
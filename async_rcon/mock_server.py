@@ -0,0 +1,237 @@
+import argparse
+import asyncio
+import contextlib
+import random
+from typing import Callable, Optional
+
+from async_rcon.codec import (
+    RawPacket,
+    RconCodec,
+    _PacketType,
+    _RequestId,
+    encode_raw_packet_into,
+)
+
+# Vanilla reads at most this many bytes per packet, see MC-72390.
+VANILLA_READ_SIZE = 1460
+VANILLA_FRAGMENT_SIZE = 4096
+
+
+def default_handler(command: str) -> str:
+    name, _, argument = command.partition(" ")
+    match name:
+        case "list":
+            return "There are 0 of a max of 20 players online: "
+        case "echo":
+            return argument
+        case "say":
+            # Succeeds without output, like tellraw or title.
+            return ""
+        case "blob":
+            # Deterministic text with multibyte characters, to split across fragments.
+            size = int(argument or 0)
+            return ("abcdéfgh你好" * (size // 10 + 1))[:size]
+    return "Unknown or incomplete command, see below for error"
+
+
+class _MockSession:
+    def __init__(
+        self,
+        server: "MockRconServer",
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.authenticated: bool = False
+        self._codec = RconCodec()
+        self._outgoing: asyncio.Queue[tuple[float, bytes]] = asyncio.Queue()
+        self._last_due: float = 0.0
+
+    async def run(self):
+        flush_task = asyncio.create_task(self.__flush_loop())
+        try:
+            while (packet := await self.__read_packet()) is not None:
+                await self.__handle(packet)
+            # Let already scheduled responses go out before closing.
+            await self._outgoing.join()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, ConnectionError):
+                await flush_task
+            self.writer.close()
+            with contextlib.suppress(ConnectionError):
+                await self.writer.wait_closed()
+
+    async def __read_packet(self) -> Optional[RawPacket]:
+        if self.server.mc72390:
+            # Vanilla parses exactly one packet per read and drops the connection
+            # when a read holds anything else.
+            data = await self.reader.read(VANILLA_READ_SIZE)
+            if len(data) < 14 or int.from_bytes(data[:4], "little") != len(data) - 4:
+                if data:
+                    self.server.dropped_connections += 1
+                return None
+            self._codec.receive_data(data)
+            return self._codec.next_raw_packet()
+        while (packet := self._codec.next_raw_packet()) is None:
+            data = await self.reader.read(2**16)
+            if not data:
+                return None
+            self._codec.receive_data(data)
+        return packet
+
+    async def __handle(self, packet: RawPacket):
+        server = self.server
+        if packet.packet_type == _PacketType.LOGIN_REQUEST:
+            self.authenticated = packet.body.decode("utf8") == server.password
+            server.logins += 1
+            request_id = (
+                packet.request_id if self.authenticated else _RequestId.LOGIN_FAIL
+            )
+            self.__respond(request_id, _PacketType.AUTH_RESPONSE, [b""])
+            return
+        if not self.authenticated:
+            self.__respond(_RequestId.LOGIN_FAIL, _PacketType.AUTH_RESPONSE, [b""])
+            return
+        if packet.packet_type != _PacketType.COMMAND_REQUEST:
+            self.__respond(
+                packet.request_id,
+                _PacketType.COMMAND_RESPONSE,
+                [f"Unknown request {hex(packet.packet_type)[2:]}".encode("utf8")],
+            )
+            return
+        server.commands += 1
+        if server.processing_time:
+            # The game answers commands one after another on its main thread.
+            await asyncio.sleep(server.processing_time)
+        body = server.handler(packet.body.decode("utf8")).encode("utf8")
+        size = server.fragment_size
+        fragments = [body[i : i + size] for i in range(0, len(body), size)] or [b""]
+        self.__respond(packet.request_id, _PacketType.COMMAND_RESPONSE, fragments)
+
+    def __respond(self, request_id: int, packet_type: int, fragments: list[bytes]):
+        buffer = bytearray()
+        for fragment in fragments:
+            encode_raw_packet_into(buffer, request_id, packet_type, fragment)
+        server = self.server
+        delay = server.latency + server.random.uniform(0, server.jitter)
+        # Jitter must not reorder responses on one connection.
+        self._last_due = max(self._last_due, asyncio.get_running_loop().time() + delay)
+        self._outgoing.put_nowait((self._last_due, bytes(buffer)))
+
+    async def __flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due, data = await self._outgoing.get()
+            if (wait := due - loop.time()) > 0:
+                await asyncio.sleep(wait)
+            self.writer.write(data)
+            await self.writer.drain()
+            self.server.bytes_sent += len(data)
+            self._outgoing.task_done()
+
+
+class MockRconServer:
+    def __init__(
+        self,
+        password: str = "password",
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        processing_time: float = 0.0,
+        fragment_size: int = VANILLA_FRAGMENT_SIZE,
+        mc72390: bool = False,
+        handler: Optional[Callable[[str], str]] = None,
+        seed: int = 0,
+    ):
+        self.password = password
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.processing_time = processing_time
+        self.fragment_size = fragment_size
+        self.mc72390 = mc72390
+        self.handler: Callable[[str], str] = handler or default_handler
+        self.random = random.Random(seed)
+        self.connections: int = 0
+        self.logins: int = 0
+        self.commands: int = 0
+        self.dropped_connections: int = 0
+        self.bytes_sent: int = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sessions: set[asyncio.Task] = set()
+
+    async def start(self) -> tuple[str, int]:
+        self._server = await asyncio.start_server(self.__accept, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.host, self.port
+
+    async def close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        for task in list(self._sessions):
+            task.cancel()
+        await asyncio.gather(*self._sessions, return_exceptions=True)
+        if server is not None:
+            await server.wait_closed()
+
+    async def __aenter__(self) -> "MockRconServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def __accept(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        self.connections += 1
+        task = asyncio.current_task()
+        assert task is not None
+        self._sessions.add(task)
+        try:
+            await _MockSession(self, reader, writer).run()
+        except asyncio.CancelledError:
+            pass  # Server is closing.
+        finally:
+            self._sessions.discard(task)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run a local mock RCON server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=25575)
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--processing-time", type=float, default=0.0)
+    parser.add_argument("--fragment-size", type=int, default=VANILLA_FRAGMENT_SIZE)
+    parser.add_argument("--mc72390", action="store_true")
+    args = parser.parse_args()
+    server = MockRconServer(
+        args.password,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        processing_time=args.processing_time,
+        fragment_size=args.fragment_size,
+        mc72390=args.mc72390,
+    )
+    host, port = await server.start()
+    # Flushed right away, the benchmark reads it from a pipe.
+    print(f"Mock RCON server listening on {host}:{port}", flush=True)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(main())
@@ -0,0 +1,129 @@
+import asyncio
+from logging import Logger
+from typing import AsyncIterator, Iterable, Optional
+
+from async_rcon import AsyncRconConnection
+from async_rcon.pool import RconPool
+
+
+class _Server:
+    def __init__(
+        self, name: str, target: AsyncRconConnection | RconPool, tags: set[str]
+    ) -> None:
+        self.name: str = name
+        self.target: AsyncRconConnection | RconPool = target
+        self.tags: set[str] = tags
+
+
+class MultiServerClient:
+    ALL = "all"
+
+    def __init__(self, *, logger: Optional[Logger] = None):
+        self.logger = logger
+        self._servers: dict[str, _Server] = {}
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._servers)
+
+    def add_server(
+        self,
+        name: str,
+        target: AsyncRconConnection | RconPool,
+        tags: Iterable[str] = (),
+    ):
+        if name in self._servers:
+            raise ValueError(f"Duplicate rcon server name: {name}")
+        self._servers[name] = _Server(name, target, set(tags))
+
+    async def remove_server(self, name: str):
+        server = self._servers.pop(name)
+        if isinstance(server.target, RconPool):
+            await server.target.close()
+        else:
+            await server.target.disconnect()
+
+    def set_tags(self, name: str, tags: Iterable[str]):
+        self._servers[name].tags = set(tags)
+
+    async def retarget(self, name: str, address: str, port: int, password: str) -> bool:
+        target = self._servers[name].target
+        if isinstance(target, RconPool):
+            return await target.retarget(address, port, password)
+        target.address = address
+        target.port = port
+        target.password = password
+        return await target.connect()
+
+    def get(self, name: str) -> AsyncRconConnection | RconPool:
+        return self._servers[name].target
+
+    def select(self, target: Optional[str] = None) -> list[str]:
+        # A server name wins over a tag with the same spelling.
+        if target is None or target == self.ALL:
+            return self.names
+        if target in self._servers:
+            return [target]
+        return [name for name, server in self._servers.items() if target in server.tags]
+
+    async def start(self, lazy: bool = False) -> dict[str, bool]:
+        # Lazy connections connect on their first command instead.
+        async def start_one(server: _Server) -> bool:
+            if isinstance(server.target, RconPool):
+                return await server.target.start(lazy)
+            return lazy or await server.target.connect()
+
+        results = await asyncio.gather(
+            *(start_one(server) for server in self._servers.values())
+        )
+        for name, ok in zip(self._servers, results):
+            if not ok and self.logger:
+                self.logger.warning(f"Failed to connect rcon server {name}")
+        return dict(zip(self._servers, results))
+
+    async def close(self):
+        async def close_one(server: _Server):
+            if isinstance(server.target, RconPool):
+                await server.target.close()
+            else:
+                await server.target.disconnect()
+
+        await asyncio.gather(
+            *(close_one(server) for server in self._servers.values()),
+            return_exceptions=True,
+        )
+
+    async def send_command(
+        self, name: str, command: str, *, timeout: Optional[float] = None
+    ) -> Optional[str]:
+        return await self._servers[name].target.send_command(command, timeout=timeout)
+
+    async def broadcast(
+        self, command: str, *, target: Optional[str] = None, timeout: float = 5.0
+    ) -> AsyncIterator[tuple[str, Optional[str]]]:
+        # Yields (server name, response) as each server answers, None on failure.
+        async def run_one(name: str) -> tuple[str, Optional[str]]:
+            try:
+                return name, await self.send_command(name, command, timeout=timeout)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"Rcon broadcast to {name} failed: {e!r}")
+                return name, None
+
+        tasks = [asyncio.create_task(run_one(name)) for name in self.select(target)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def broadcast_all(
+        self, command: str, *, target: Optional[str] = None, timeout: float = 5.0
+    ) -> dict[str, Optional[str]]:
+        return {
+            name: result
+            async for name, result in self.broadcast(
+                command, target=target, timeout=timeout
+            )
+        }
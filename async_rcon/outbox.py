@@ -0,0 +1,321 @@
+import asyncio
+import contextlib
+import dataclasses
+import itertools
+import json
+import time
+from logging import Logger
+from typing import Optional
+
+from async_rcon import AsyncRconConnection
+from async_rcon.pool import RconPool
+from async_rcon.scheduler import CommandScheduler, Priority
+
+OutboxTarget = AsyncRconConnection | RconPool | CommandScheduler
+
+
+@dataclasses.dataclass(frozen=True)
+class OutboxEntry:
+    id: int
+    command: str
+    key: Optional[str] = None
+    # Wall clock time, entries loaded from the journal keep their deadline.
+    expires: Optional[float] = None
+
+
+class CommandOutbox:
+    # Fire-and-forget commands survive outages here and are flushed in
+    # batches once the server answers again. Delivery is at least once, a
+    # command whose batch broke halfway may run twice.
+    def __init__(
+        self,
+        target: OutboxTarget,
+        *,
+        max_size: int = 10000,
+        ttl: Optional[float] = 600.0,
+        batch_size: int = 100,
+        timeout: Optional[float] = 30.0,
+        retry_initial: float = 0.5,
+        retry_max: float = 10.0,
+        path: Optional[str] = None,
+        source: str = "outbox",
+        logger: Optional[Logger] = None,
+    ):
+        if max_size < 1 or batch_size < 1:
+            raise ValueError("max_size and batch_size must be at least 1")
+        self.target = target
+        self.max_size = max_size
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        # Append-only journal, None keeps the outbox in memory only.
+        self.path = path
+        self.source = source
+        self.logger = logger
+        # Insertion ordered, re-queueing a key moves it to the end.
+        self._entries: dict[int, OutboxEntry] = {}
+        self._keys: dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._journal: list[str] = []
+        self._journal_lines: int = 0
+        self._wakeup = asyncio.Event()
+        self._retry_at: float = 0.0
+        self._delay: float = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued: int = 0
+        self.sent: int = 0
+        self.replaced: int = 0
+        self.expired: int = 0
+        self.dropped: int = 0
+        self.failed_flushes: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.__run())
+        return self._task
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await self.__persist()
+
+    def wake(self):
+        # The connection is back, retry now instead of after the backoff.
+        self._retry_at = 0.0
+        self._delay = 0.0
+        self._wakeup.set()
+
+    def enqueue(
+        self, command: str, *, key: Optional[str] = None, ttl: Optional[float] = None
+    ) -> OutboxEntry:
+        # Only the latest command per key is kept, e.g. one "scoreboard players
+        # set" per player and objective however often it changed offline.
+        ttl = self.ttl if ttl is None else ttl
+        entry = OutboxEntry(
+            next(self._ids),
+            command.strip(),
+            key,
+            time.time() + ttl if ttl is not None else None,
+        )
+        if key is not None and key in self._keys:
+            self.__remove(self._keys[key])
+            self.replaced += 1
+        elif len(self._entries) >= self.max_size:
+            self.__remove(next(iter(self._entries)))
+            self.dropped += 1
+        self.__add(entry)
+        self.enqueued += 1
+        self._wakeup.set()
+        return entry
+
+    async def send(
+        self, command: str, *, key: Optional[str] = None, ttl: Optional[float] = None
+    ) -> Optional[str]:
+        # Sends right away while the server is reachable and nothing is queued,
+        # otherwise queues the command and returns None.
+        if not self._entries and not self._delay:
+            try:
+                result = await self.__send([command])
+            except Exception:
+                result = [None]
+            # "" counts as sent, only None means the server did not answer.
+            if result[0] is not None:
+                self.sent += 1
+                return result[0]
+        self.enqueue(command, key=key, ttl=ttl)
+        return None
+
+    def pending(self, limit: Optional[int] = None) -> list[OutboxEntry]:
+        return list(itertools.islice(self._entries.values(), limit))
+
+    def clear(self):
+        for entry_id in list(self._entries):
+            self.__remove(entry_id)
+        self._wakeup.set()
+
+    async def load(self):
+        # Replays the journal, then rewrites it with only the live entries.
+        if self.path is None:
+            return
+        import aiofiles
+
+        try:
+            async with aiofiles.open(self.path, mode="r", encoding="utf8") as f:
+                lines: list[str] = (await f.read()).splitlines()
+        except FileNotFoundError:
+            return
+        entries: dict[int, OutboxEntry] = {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+                if "done" in record:
+                    entries.pop(record["done"], None)
+                else:
+                    entries[record["id"]] = OutboxEntry(**record)
+            except (ValueError, TypeError, KeyError):
+                # A line cut short by a crash, everything before it is intact.
+                continue
+        now = time.time()
+        for entry in entries.values():
+            if entry.expires is not None and entry.expires <= now:
+                self.expired += 1
+                continue
+            if entry.key is not None and entry.key in self._keys:
+                self._entries.pop(self._keys[entry.key])
+            self._entries[entry.id] = entry
+            if entry.key is not None:
+                self._keys[entry.key] = entry.id
+        self._ids = itertools.count(max(entries, default=0) + 1)
+        await self.__compact()
+        if self._entries and self.logger:
+            self.logger.info(f"Restored {len(self._entries)} queued rcon commands.")
+        self._wakeup.set()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queued": len(self._entries),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "replaced": self.replaced,
+            "expired": self.expired,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+        }
+
+    def describe(self, limit: int = 10) -> list[str]:
+        lines = [", ".join(f"{key}: {value}" for key, value in self.stats().items())]
+        if self._delay:
+            lines.append(f"Server unreachable, retrying every {self._delay:.1f}s")
+        for entry in self.pending(limit):
+            key = f" [{entry.key}]" if entry.key is not None else ""
+            lines.append(f"#{entry.id}{key} {entry.command}")
+        if len(self._entries) > limit:
+            lines.append(f"... and {len(self._entries) - limit} more")
+        return lines
+
+    def __add(self, entry: OutboxEntry):
+        self._entries[entry.id] = entry
+        if entry.key is not None:
+            self._keys[entry.key] = entry.id
+        if self.path is not None:
+            self._journal.append(json.dumps(dataclasses.asdict(entry)))
+
+    def __remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        if entry.key is not None and self._keys.get(entry.key) == entry_id:
+            del self._keys[entry.key]
+        if self.path is not None:
+            self._journal.append(json.dumps({"done": entry_id}))
+
+    async def __run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            await self.__persist()
+            now = loop.time()
+            if self._entries and now >= self._retry_at:
+                if await self.__flush():
+                    self._delay = 0.0
+                else:
+                    self.failed_flushes += 1
+                    self._delay = min(
+                        self.retry_max, self._delay * 2 or self.retry_initial
+                    )
+                    self._retry_at = loop.time() + self._delay
+                continue
+            delay = self._retry_at - now if self._entries else None
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+
+    async def __flush(self) -> bool:
+        # One batch, True when every command in it got an answer.
+        now = time.time()
+        batch: list[OutboxEntry] = []
+        for entry in list(self._entries.values()):
+            if entry.expires is not None and entry.expires <= now:
+                self.__remove(entry.id)
+                self.expired += 1
+                continue
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                break
+        if not batch:
+            return True
+        try:
+            results = await self.__send([entry.command for entry in batch])
+        except Exception as e:
+            # Timeouts, a full scheduler queue or a pool without connections.
+            if self.logger:
+                self.logger.debug(f"Rcon outbox flush failed: {e!r}")
+            return False
+        answered = delivered = 0
+        for entry, result in zip(batch, results):
+            # None means the command got no answer. "" is a delivered command
+            # without output (say, tellraw), it must not be sent again.
+            if result is None:
+                continue
+            answered += 1
+            # Skip entries replaced by a newer command with the same key meanwhile.
+            if self._entries.get(entry.id) is entry:
+                self.__remove(entry.id)
+                delivered += 1
+        self.sent += delivered
+        if delivered and self.logger:
+            self.logger.debug(
+                f"Rcon outbox flushed {delivered} commands, {len(self._entries)} left."
+            )
+        return answered == len(batch)
+
+    async def __send(self, commands: list[str]) -> list[Optional[str]]:
+        target = self.target
+        if isinstance(target, CommandScheduler):
+            return await target.send_commands(
+                commands,
+                priority=Priority.PLUGIN,
+                source=self.source,
+                timeout=self.timeout,
+            )
+        return await target.send_commands(commands, timeout=self.timeout)
+
+    async def __persist(self):
+        if self.path is None or not self._journal:
+            return
+        # Compacting once dead records dominate keeps replay and disk use small.
+        if self._journal_lines > 1000 + 4 * len(self._entries):
+            await self.__compact()
+            return
+        import aiofiles
+
+        # Records are only dropped once written, replaying one twice is harmless.
+        count = len(self._journal)
+        async with aiofiles.open(self.path, mode="a", encoding="utf8") as f:
+            await f.write("".join(f"{line}\n" for line in self._journal[:count]))
+        del self._journal[:count]
+        self._journal_lines += count
+
+    async def __compact(self):
+        if self.path is None:
+            return
+        import aiofiles
+        import aiofiles.os
+
+        count = len(self._journal)
+        lines = [json.dumps(dataclasses.asdict(e)) for e in self._entries.values()]
+        temporary = f"{self.path}.tmp"
+        async with aiofiles.open(temporary, mode="w", encoding="utf8") as f:
+            await f.write("".join(f"{line}\n" for line in lines))
+        await aiofiles.os.replace(temporary, self.path)
+        del self._journal[:count]
+        self._journal_lines = len(lines)
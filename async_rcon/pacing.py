@@ -0,0 +1,140 @@
+import time
+from typing import Literal
+
+PacingMode = Literal["none", "fixed", "token_bucket", "adaptive"]
+
+
+class PacingPolicy:
+    # Minimum spacing between two writes on one connection, see MC-72390.
+    name: str = "none"
+
+    def __init__(self, interval: float = 0.0) -> None:
+        self.interval: float = interval
+        self.last_delay: float = 0.0
+        self.total_delay: float = 0.0
+        self.packets: int = 0
+        self._next_write: float | None = None
+
+    @property
+    def average_delay(self) -> float:
+        return self.total_delay / self.packets if self.packets else 0.0
+
+    def reserve(self) -> float:
+        delay: float = self._reserve(time.monotonic())
+        self.last_delay = delay
+        self.total_delay += delay
+        self.packets += 1
+        return delay
+
+    def _reserve(self, now: float) -> float:
+        delay: float = 0.0
+        if self._next_write is not None:
+            delay = max(0.0, self._next_write - now)
+        self._next_write = now + delay + self.interval
+        return delay
+
+    def on_success(self):
+        pass
+
+    def on_anomaly(self):
+        pass
+
+    def describe(self) -> str:
+        return (
+            f"{self.name}: interval {self.interval * 1000:.1f} ms, "
+            f"last delay {self.last_delay * 1000:.1f} ms, "
+            f"average delay {self.average_delay * 1000:.1f} ms "
+            f"over {self.packets} packets"
+        )
+
+
+class NoPacing(PacingPolicy):
+    name = "none"
+
+    def __init__(self) -> None:
+        super().__init__(0.0)
+
+
+class FixedPacing(PacingPolicy):
+    name = "fixed"
+
+    def __init__(self, delay: float = 0.03) -> None:
+        super().__init__(delay)
+
+
+class TokenBucketPacing(PacingPolicy):
+    name = "token_bucket"
+
+    def __init__(self, packets_per_second: float = 30.0, burst: int = 1) -> None:
+        if packets_per_second <= 0 or burst < 1:
+            raise ValueError("packets_per_second must be positive and burst >= 1")
+        super().__init__(1.0 / packets_per_second)
+        self.rate: float = packets_per_second
+        self.burst: int = burst
+        self._tokens: float = float(burst)
+        self._updated: float | None = None
+
+    def _reserve(self, now: float) -> float:
+        if self._updated is not None:
+            self._tokens = min(
+                float(self.burst), self._tokens + (now - self._updated) * self.rate
+            )
+        self._updated = now
+        self._tokens -= 1.0
+        if self._tokens >= 0.0:
+            return 0.0
+        # The token is borrowed, the debt is paid back by the refill while waiting.
+        return -self._tokens / self.rate
+
+
+class AdaptivePacing(PacingPolicy):
+    name = "adaptive"
+
+    def __init__(
+        self,
+        min_delay: float = 0.0,
+        max_delay: float = 0.1,
+        step: float = 0.01,
+        recover_after: int = 50,
+    ) -> None:
+        super().__init__(min_delay)
+        self.min_delay: float = min_delay
+        self.max_delay: float = max_delay
+        self.step: float = step
+        self.recover_after: int = recover_after
+        self.anomalies: int = 0
+        self._successes: int = 0
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= self.recover_after and self.interval > self.min_delay:
+            self.interval = max(self.min_delay, self.interval - self.step)
+            self._successes = 0
+
+    def on_anomaly(self):
+        self.anomalies += 1
+        self._successes = 0
+        self.interval = min(self.max_delay, max(self.step, self.interval * 2))
+
+    def describe(self) -> str:
+        return f"{super().describe()}, {self.anomalies} anomalies"
+
+
+def create_pacing(
+    mode: PacingMode = "fixed",
+    *,
+    delay: float = 0.03,
+    packets_per_second: float = 30.0,
+    burst: int = 1,
+    max_delay: float = 0.1,
+) -> PacingPolicy:
+    match mode:
+        case "none":
+            return NoPacing()
+        case "fixed":
+            return FixedPacing(delay)
+        case "token_bucket":
+            return TokenBucketPacing(packets_per_second, burst)
+        case "adaptive":
+            return AdaptivePacing(max_delay=max_delay)
+    raise ValueError(f"Unknown pacing mode: {mode}")
@@ -0,0 +1,354 @@
+import dataclasses
+import functools
+import re
+from typing import Any, Callable, Optional
+
+SnbtValue = dict[str, Any] | list[Any] | str | int | float | bool
+ResponseParser = Callable[[str], Any]
+
+
+class ResponseParseError(ValueError):
+    def __init__(self, message: str, response: str) -> None:
+        super().__init__(message)
+        self.response = response
+
+
+@dataclasses.dataclass(frozen=True)
+class PlayerList:
+    online: int
+    max: int
+    players: tuple[str, ...]
+    # Only filled by "list uuids", in the same order as players.
+    uuids: tuple[str, ...] = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class TickReport:
+    tps: Optional[float]
+    mspt: Optional[float]
+    # Paper's 1m, 5m and 15m averages.
+    recent: tuple[float, ...] = ()
+    # Forge's per-dimension (tps, mspt).
+    dimensions: dict[str, tuple[float, float]] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass(frozen=True)
+class TimeQuery:
+    value: int
+
+
+@dataclasses.dataclass(frozen=True)
+class Score:
+    holder: str
+    objective: str
+    value: int
+
+
+@dataclasses.dataclass(frozen=True)
+class ScoreList:
+    holder: str
+    scores: dict[str, int]
+
+
+@dataclasses.dataclass(frozen=True)
+class DataResult:
+    kind: str
+    target: str
+    value: SnbtValue
+
+
+# Vanilla RCON joins the lines of a response without any separator, so none of
+# these may rely on line breaks.
+_FORMATTING = re.compile(r"§.")
+_PLAYER_LIST = re.compile(
+    r"There are (\d+) of a max of (\d+) players online:\s?(.*)"
+    r"|There are (\d+)/(\d+) players online:\s?(.*)",
+    re.S,
+)
+_PLAYER_UUID = re.compile(r"(.*) \(([0-9a-f-]{36})\)")
+_TIME = re.compile(r"The time is (-?\d+)")
+_SCORE = re.compile(r"(.+) has (-?\d+) \[(.*)\]", re.S)
+_SCORE_LIST = re.compile(r"(.+?) has (?:\d+ scores:|no scores to show)", re.S)
+_SCORE_ENTRY = re.compile(r"\[([^\]]*)\]: (-?\d+)")
+_DATA = re.compile(
+    r"(?:(.+?) has the following (entity|block) data|Storage (\S+) has the "
+    r"following (contents)): ",
+    re.S,
+)
+_PAPER_TPS = re.compile(r"TPS from last [^:]*: ([*\d., ]+)")
+_FORGE_TPS = re.compile(
+    r"([^\s\d.][^\n]*?)\s*: Mean tick time: ([\d.]+) ms\. Mean TPS: ([\d.]+)"
+)
+_NEOFORGE_TPS = re.compile(r"([^\s\d.][^\n]*?)\s*: ([\d.]+) TPS \(([\d.]+) ms/tick\)")
+_VANILLA_RATE = re.compile(r"Target tick rate: ([\d.]+)")
+_VANILLA_MSPT = re.compile(r"Average time per tick: ([\d.]+) ?ms")
+
+_SNBT_TOKEN = re.compile(
+    r"""\s*(?:([{}\[\],:;])|"([^"\\]*(?:\\.[^"\\]*)*)"|'([^'\\]*(?:\\.[^'\\]*)*)'"""
+    r"|([0-9A-Za-z_\-.+]+))",
+    re.S,
+)
+_SNBT_TYPED_ARRAY = re.compile(r"\s*[BIL]\s*;")
+_SNBT_LIST_END = re.compile(r"\s*\]")
+_SNBT_ESCAPE = re.compile(r"\\(?:u([0-9a-fA-F]{4})|x([0-9a-fA-F]{2})|(.))", re.S)
+_SNBT_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "s": " "}
+_SNBT_NUMBER = re.compile(
+    r"([-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?)([bBsSlLfFdD]?)"
+)
+
+
+def parse_snbt(text: str) -> SnbtValue:
+    # Iterative single pass, deep NBT cannot hit the recursion limit and large
+    # entity dumps parse in linear time. Typed arrays become plain lists.
+    stack: list[Any] = []
+    # The pending key of every open compound, None for lists.
+    keys: list[Optional[str]] = []
+    pos = 0
+    while True:
+        kind, token, pos = _snbt_token(text, pos)
+        value: Any
+        if kind == "{":
+            kind, token, pos = _snbt_token(text, pos)
+            if kind != "}":
+                stack.append({})
+                keys.append(_snbt_key(kind, token, text, pos))
+                pos = _snbt_expect(text, pos, ":")
+                continue
+            value = {}
+        elif kind == "[":
+            if typed := _SNBT_TYPED_ARRAY.match(text, pos):
+                pos = typed.end()
+            if end := _SNBT_LIST_END.match(text, pos):
+                pos = end.end()
+                value = []
+            else:
+                stack.append([])
+                keys.append(None)
+                continue
+        elif kind == "string":
+            value = token
+        elif kind == "word":
+            value = _snbt_scalar(token)
+        else:
+            raise _snbt_error(text, pos, "expected a value")
+        # Store the value, then close every container that ends right after it.
+        while True:
+            if not stack:
+                if pos < len(text) and not text[pos:].isspace():
+                    raise _snbt_error(text, pos, "trailing data")
+                return value
+            key = keys[-1]
+            if key is None:
+                stack[-1].append(value)
+            else:
+                stack[-1][key] = value
+            kind, token, pos = _snbt_token(text, pos)
+            if kind == ("]" if key is None else "}"):
+                value = stack.pop()
+                keys.pop()
+                continue
+            if kind != ",":
+                raise _snbt_error(text, pos, "expected ',' or the end of a container")
+            if key is None:
+                if end := _SNBT_LIST_END.match(text, pos):
+                    pos = end.end()
+                    value = stack.pop()
+                    keys.pop()
+                    continue
+                break
+            kind, token, pos = _snbt_token(text, pos)
+            if kind == "}":
+                value = stack.pop()
+                keys.pop()
+                continue
+            keys[-1] = _snbt_key(kind, token, text, pos)
+            pos = _snbt_expect(text, pos, ":")
+            break
+
+
+def _snbt_token(text: str, pos: int) -> tuple[str, str, int]:
+    match = _SNBT_TOKEN.match(text, pos)
+    if match is None:
+        return "", "", pos
+    punctuation, double, single, word = match.groups()
+    if punctuation is not None:
+        return punctuation, punctuation, match.end()
+    if word is not None:
+        return "word", word, match.end()
+    quoted = double if double is not None else single
+    if "\\" in quoted:
+        quoted = _SNBT_ESCAPE.sub(_snbt_unescape, quoted)
+    return "string", quoted, match.end()
+
+
+def _snbt_unescape(match: re.Match) -> str:
+    code, byte, char = match.groups()
+    if char is not None:
+        return _SNBT_ESCAPES.get(char, char)
+    return chr(int(code or byte, 16))
+
+
+def _snbt_key(kind: str, token: str, text: str, pos: int) -> str:
+    if kind not in ("word", "string"):
+        raise _snbt_error(text, pos, "expected a key")
+    return token
+
+
+def _snbt_expect(text: str, pos: int, expected: str) -> int:
+    kind, _, pos = _snbt_token(text, pos)
+    if kind != expected:
+        raise _snbt_error(text, pos, f"expected '{expected}'")
+    return pos
+
+
+def _snbt_scalar(word: str) -> SnbtValue:
+    match = _SNBT_NUMBER.fullmatch(word)
+    if match is None:
+        if word in ("true", "false"):
+            return word == "true"
+        return word
+    number, suffix = match.groups()
+    if (suffix and suffix in "fFdD") or any(c in number for c in ".eE"):
+        return float(number)
+    return int(number)
+
+
+def _snbt_error(text: str, pos: int, message: str) -> ResponseParseError:
+    return ResponseParseError(
+        f"Invalid SNBT at {pos}: {message} near {text[pos : pos + 20]!r}", text
+    )
+
+
+def strip_formatting(response: str) -> str:
+    return _FORMATTING.sub("", response)
+
+
+# Responses are memoized by payload, parsed results are shared between callers
+# and must not be modified.
+@functools.lru_cache(maxsize=256)
+def parse_player_list(response: str) -> PlayerList:
+    match = _PLAYER_LIST.search(response)
+    if match is None:
+        raise ResponseParseError("Not a player list", response)
+    online, max_players, names = (
+        match.group(1, 2, 3) if match.group(1) else match.group(4, 5, 6)
+    )
+    entries = [name.strip() for name in names.split(",") if name.strip()]
+    uuids = [_PLAYER_UUID.fullmatch(entry) for entry in entries]
+    if entries and all(uuids):
+        return PlayerList(
+            int(online),
+            int(max_players),
+            tuple(uuid.group(1) for uuid in uuids if uuid),
+            tuple(uuid.group(2) for uuid in uuids if uuid),
+        )
+    return PlayerList(int(online), int(max_players), tuple(entries))
+
+
+@functools.lru_cache(maxsize=256)
+def parse_tick_report(response: str) -> TickReport:
+    # Paper "tps", Forge and NeoForge "forge tps"/"neoforge tps", vanilla "tick query".
+    response = strip_formatting(response)
+    if match := _PAPER_TPS.search(response):
+        recent = tuple(
+            float(value.strip().lstrip("*"))
+            for value in match.group(1).split(",")
+            if value.strip()
+        )
+        return TickReport(recent[0] if recent else None, None, recent)
+    dimensions = {
+        name: (float(tps), float(mspt))
+        for name, mspt, tps in _FORGE_TPS.findall(response)
+    }
+    dimensions.update(
+        {
+            name: (float(tps), float(mspt))
+            for name, tps, mspt in _NEOFORGE_TPS.findall(response)
+        }
+    )
+    if dimensions:
+        tps, mspt = dimensions.pop("Overall", (None, None))
+        return TickReport(tps, mspt, dimensions=dimensions)
+    if match := _VANILLA_MSPT.search(response):
+        mspt = float(match.group(1))
+        rate = _VANILLA_RATE.search(response)
+        target = float(rate.group(1)) if rate else 20.0
+        return TickReport(min(target, 1000 / mspt) if mspt else target, mspt)
+    raise ResponseParseError("Not a TPS report", response)
+
+
+@functools.lru_cache(maxsize=256)
+def parse_time(response: str) -> TimeQuery:
+    match = _TIME.search(response)
+    if match is None:
+        raise ResponseParseError("Not a time query result", response)
+    return TimeQuery(int(match.group(1)))
+
+
+@functools.lru_cache(maxsize=256)
+def parse_score(response: str) -> Score:
+    match = _SCORE.fullmatch(response.strip())
+    if match is None:
+        raise ResponseParseError("Not a score", response)
+    return Score(match.group(1), match.group(3), int(match.group(2)))
+
+
+@functools.lru_cache(maxsize=256)
+def parse_score_list(response: str) -> ScoreList:
+    match = _SCORE_LIST.match(response)
+    if match is None:
+        raise ResponseParseError("Not a score list", response)
+    return ScoreList(
+        match.group(1),
+        {
+            objective: int(value)
+            for objective, value in _SCORE_ENTRY.findall(response, match.end())
+        },
+    )
+
+
+# Entity dumps are large, keep fewer of them.
+@functools.lru_cache(maxsize=32)
+def parse_data(response: str) -> DataResult:
+    match = _DATA.match(response)
+    if match is None:
+        raise ResponseParseError("Not a data get result", response)
+    if match.group(1) is not None:
+        target, kind = match.group(1, 2)
+    else:
+        target, kind = match.group(3), "storage"
+    return DataResult(kind, target, parse_snbt(response[match.end() :]))
+
+
+DEFAULT_PARSERS: dict[str, ResponseParser] = {
+    r"list( uuids)?": parse_player_list,
+    r"((forge|neoforge) )?tps|tick query": parse_tick_report,
+    r"time query \w+": parse_time,
+    r"scoreboard players get \S+ \S+": parse_score,
+    r"scoreboard players list \S+": parse_score_list,
+    r"data get (entity|block|storage) .+": parse_data,
+}
+_COMPILED_PARSERS: list[tuple[re.Pattern, ResponseParser]] = [
+    (re.compile(pattern), parser) for pattern, parser in DEFAULT_PARSERS.items()
+]
+
+
+def parser_for(command: str) -> Optional[ResponseParser]:
+    command = command.strip().removeprefix("/").removeprefix("minecraft:")
+    for pattern, parser in _COMPILED_PARSERS:
+        if pattern.fullmatch(command):
+            return parser
+    return None
+
+
+def require_parser(command: str) -> ResponseParser:
+    parser = parser_for(command)
+    if parser is None:
+        raise ValueError(f"No parser for command {command!r}")
+    return parser
+
+
+def parse_response(
+    command: str, response: str, parser: Optional[ResponseParser] = None
+) -> Any:
+    return (parser or require_parser(command))(response)
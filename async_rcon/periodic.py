@@ -0,0 +1,284 @@
+import asyncio
+import contextlib
+import heapq
+import inspect
+import itertools
+import random
+from logging import Logger
+from typing import Awaitable, Callable, Optional
+
+from async_rcon import AsyncRconConnection
+from async_rcon.cache import ResponseCache
+from async_rcon.pool import RconPool
+from async_rcon.scheduler import CommandScheduler, Priority
+
+PeriodicTarget = AsyncRconConnection | RconPool | CommandScheduler | ResponseCache
+PeriodicCallback = Callable[[str], Optional[Awaitable[None]]]
+
+
+class PeriodicSubscription:
+    def __init__(
+        self,
+        owner: "PeriodicScheduler",
+        command: str,
+        interval: float,
+        jitter: float,
+        callback: PeriodicCallback,
+    ) -> None:
+        self.owner = owner
+        self.command = command
+        self.interval = interval
+        self.jitter = jitter
+        self.callback = callback
+        # The last output handed to this subscriber, it is only called again
+        # once the output changes.
+        self.last_seen: Optional[str] = None
+        self.active: bool = True
+
+    def cancel(self):
+        self.owner.unsubscribe(self)
+
+
+class _PeriodicJob:
+    def __init__(self, command: str) -> None:
+        self.command = command
+        self.subscriptions: list[PeriodicSubscription] = []
+        self.interval: float = 0.0
+        self.jitter: float = 0.0
+        # Window the current phase was drawn from, min(interval, spread).
+        self.spread: float = 0.0
+        self.due: float = 0.0
+        # Heap entries of older generations are stale and skipped when popped.
+        self.generation: int = 0
+        self.task: Optional[asyncio.Task] = None
+        self.last_result: Optional[str] = None
+        self.runs: int = 0
+        self.changes: int = 0
+        self.failures: int = 0
+        self.skipped: int = 0
+
+
+class PeriodicScheduler:
+    def __init__(
+        self,
+        target: PeriodicTarget,
+        *,
+        max_concurrent: int = 2,
+        timeout: Optional[float] = 10.0,
+        priority: Priority = Priority.BACKGROUND,
+        source: str = "periodic",
+        spread: float = 5.0,
+        logger: Optional[Logger] = None,
+    ):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.target = target
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.priority = priority
+        self.source = source
+        # New commands first run at a random point within this window.
+        self.spread = spread
+        self.logger = logger
+        # One job per command, however many plugins subscribed to it.
+        self.jobs: dict[str, _PeriodicJob] = {}
+        self._heap: list[tuple[float, int, _PeriodicJob, int]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._callbacks: set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def subscriptions(self) -> int:
+        return sum(len(job.subscriptions) for job in self.jobs.values())
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.__run())
+        return self._task
+
+    async def stop(self):
+        task, self._task = self._task, None
+        tasks = [job.task for job in self.jobs.values() if job.task is not None]
+        tasks += list(self._callbacks)
+        if task is not None:
+            tasks.append(task)
+        for pending in tasks:
+            pending.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def subscribe(
+        self,
+        command: str,
+        interval: float,
+        callback: PeriodicCallback,
+        *,
+        jitter: float = 0.1,
+    ) -> PeriodicSubscription:
+        # The command runs at the shortest interval among its subscribers,
+        # jitter is a fraction of the interval added to or removed from every
+        # period. callback may be a plain function or a coroutine function.
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if not 0 <= jitter < 1:
+            raise ValueError("jitter must be in [0, 1)")
+        command = command.strip()
+        subscription = PeriodicSubscription(self, command, interval, jitter, callback)
+        job = self.jobs.get(command)
+        if job is None:
+            job = self.jobs[command] = _PeriodicJob(command)
+        job.subscriptions.append(subscription)
+        if job.last_result is not None:
+            # Late subscribers get the current output without waiting a period.
+            asyncio.get_running_loop().call_soon(
+                self.__notify, subscription, job.last_result
+            )
+        self.__reschedule(job)
+        return subscription
+
+    def unsubscribe(self, subscription: PeriodicSubscription):
+        if not subscription.active:
+            return
+        subscription.active = False
+        job = self.jobs.get(subscription.command)
+        if job is None:
+            return
+        job.subscriptions.remove(subscription)
+        if job.subscriptions:
+            self.__reschedule(job)
+            return
+        del self.jobs[job.command]
+        job.generation += 1
+        if job.task is not None:
+            job.task.cancel()
+
+    def stats(self) -> dict[str, int]:
+        jobs = self.jobs.values()
+        return {
+            "commands": len(self.jobs),
+            "subscriptions": self.subscriptions,
+            "runs": sum(job.runs for job in jobs),
+            "changes": sum(job.changes for job in jobs),
+            "failures": sum(job.failures for job in jobs),
+            "skipped": sum(job.skipped for job in jobs),
+        }
+
+    def describe(self, limit: int = 20) -> list[str]:
+        lines = [", ".join(f"{key}: {value}" for key, value in self.stats().items())]
+        jobs = sorted(self.jobs.values(), key=lambda job: job.interval)
+        for job in jobs[:limit]:
+            lines.append(
+                f"{job.command!r} every {job.interval:g}s for "
+                f"{len(job.subscriptions)} subscribers: {job.runs} runs, "
+                f"{job.changes} changes, {job.failures} failed, {job.skipped} skipped"
+            )
+        if len(jobs) > limit:
+            lines.append(f"... and {len(jobs) - limit} more")
+        return lines
+
+    def __reschedule(self, job: _PeriodicJob):
+        interval = min(s.interval for s in job.subscriptions)
+        spread = min(interval, self.spread)
+        job.jitter = min(s.jitter for s in job.subscriptions)
+        if job.generation and interval == job.interval and spread == job.spread:
+            return
+        # Random phase, commands registered together do not fire together. A
+        # new interval or spread draws a new one, at most spread from now.
+        due = asyncio.get_running_loop().time() + random.uniform(0, spread)
+        job.interval = interval
+        job.spread = spread
+        job.due = due
+        job.generation += 1
+        heapq.heappush(self._heap, (due, next(self._sequence), job, job.generation))
+        if self._heap[0][2] is job:
+            self._wakeup.set()
+
+    async def __run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, job, generation = heapq.heappop(self._heap)
+                if generation == job.generation:
+                    self.__launch(job, now)
+            delay = self._heap[0][0] - now if self._heap else None
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+
+    def __launch(self, job: _PeriodicJob, now: float):
+        period = job.interval * (1 + random.uniform(-job.jitter, job.jitter))
+        job.due += period
+        if job.due <= now:
+            # Fell behind, skip the missed periods instead of catching up.
+            job.due = now + period
+        heapq.heappush(self._heap, (job.due, next(self._sequence), job, job.generation))
+        if job.task is not None and not job.task.done():
+            # The previous run is still queued or in flight, do not pile up.
+            job.skipped += 1
+            return
+        job.task = asyncio.create_task(self.__execute(job))
+
+    async def __execute(self, job: _PeriodicJob):
+        async with self._slots:
+            try:
+                result = await self.__send(job.command)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.logger:
+                    self.logger.debug(f"Periodic command {job.command!r}: {e!r}")
+                result = None
+        job.runs += 1
+        if result is None:
+            job.failures += 1
+            return
+        if result != job.last_result:
+            job.changes += 1
+            job.last_result = result
+        for subscription in list(job.subscriptions):
+            if subscription.last_seen != result:
+                self.__notify(subscription, result)
+
+    async def __send(self, command: str) -> Optional[str]:
+        target = self.target
+        if isinstance(target, (CommandScheduler, ResponseCache)):
+            return await target.send_command(
+                command,
+                priority=self.priority,
+                source=self.source,
+                timeout=self.timeout,
+            )
+        return await target.send_command(command, timeout=self.timeout)
+
+    def __notify(self, subscription: PeriodicSubscription, result: str):
+        if not subscription.active:
+            return
+        subscription.last_seen = result
+        try:
+            outcome = subscription.callback(result)
+        except Exception as e:
+            self.__callback_failed(subscription, e)
+            return
+        if inspect.isawaitable(outcome):
+            task = asyncio.ensure_future(outcome)
+            self._callbacks.add(task)
+            task.add_done_callback(
+                lambda done: self.__callback_done(subscription, done)
+            )
+
+    def __callback_done(self, subscription: PeriodicSubscription, task: asyncio.Task):
+        self._callbacks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.__callback_failed(subscription, task.exception())
+
+    def __callback_failed(self, subscription: PeriodicSubscription, e: BaseException):
+        if self.logger:
+            self.logger.warning(
+                f"Periodic subscriber of {subscription.command!r} failed: {e!r}"
+            )
@@ -0,0 +1,314 @@
+import asyncio
+import contextlib
+from logging import Logger
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Optional
+
+from async_rcon import AsyncRconConnection
+from async_rcon.metrics import ConnectionMetrics
+from async_rcon.pacing import PacingPolicy
+from async_rcon.transport import TransportMode
+
+if TYPE_CHECKING:
+    from async_rcon.parsers import ResponseParser
+
+
+class _PoolMember:
+    def __init__(self, connection: AsyncRconConnection) -> None:
+        self.connection: AsyncRconConnection = connection
+        self.in_flight: int = 0
+        self.checked_out: bool = False
+
+
+class RconPool:
+    def __init__(
+        self,
+        address: str,
+        port: int,
+        password: str,
+        *,
+        min_size: int = 1,
+        max_size: int = 4,
+        logger: Optional[Logger] = None,
+        pipelined: bool = False,
+        health_check_interval: float = 10.0,
+        pacing_factory: Optional[Callable[[], PacingPolicy]] = None,
+        metrics: Optional[ConnectionMetrics] = None,
+        transport: TransportMode = "streams",
+    ):
+        if min_size < 1 or max_size < min_size:
+            raise ValueError("Pool size must satisfy 1 <= min_size <= max_size")
+        self.address = address
+        self.port = port
+        self.password = password
+        self.min_size = min_size
+        self.max_size = max_size
+        self.logger = logger
+        self.pipelined = pipelined
+        self.health_check_interval = health_check_interval
+        # Pacing state is per socket, so every connection gets its own policy.
+        self.pacing_factory = pacing_factory
+        # Metrics are shared, so they add up over every connection of the pool.
+        self.metrics = metrics
+        self.transport: TransportMode = transport
+        self._members: list[_PoolMember] = []
+        # Connections to a previous target, closed once their commands finish.
+        self._retired: list[_PoolMember] = []
+        self._opening: int = 0
+        self._condition = asyncio.Condition()
+        self._maintain_task: Optional[asyncio.Task] = None
+        self._grow_task: Optional[asyncio.Task] = None
+        self._closed: bool = True
+        # Lazy pools open their first connections on first use.
+        self._lazy: bool = False
+
+    @property
+    def size(self) -> int:
+        return len(self._members)
+
+    @property
+    def connections(self) -> list[AsyncRconConnection]:
+        return [member.connection for member in self._members]
+
+    @property
+    def in_flight(self) -> int:
+        return sum(member.in_flight for member in self._members)
+
+    async def start(self, lazy: bool = False) -> bool:
+        self._closed = False
+        self._lazy = lazy
+        if not lazy:
+            await self.__fill()
+        if self._maintain_task is None:
+            self._maintain_task = asyncio.create_task(self.__maintain())
+        return lazy or bool(self._members)
+
+    async def close(self):
+        self._closed = True
+        for task in (self._maintain_task, self._grow_task):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        self._maintain_task = None
+        self._grow_task = None
+        members, self._members = self._members + self._retired, []
+        self._retired = []
+        await asyncio.gather(
+            *(member.connection.disconnect() for member in members),
+            return_exceptions=True,
+        )
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def retarget(self, address: str, port: int, password: str) -> bool:
+        # New commands go to the new server right away, commands still running
+        # on the old connections are left to finish.
+        self.address = address
+        self.port = port
+        self.password = password
+        members, self._members = self._members, []
+        for member in members:
+            if member.in_flight or member.checked_out:
+                self._retired.append(member)
+            else:
+                await member.connection.disconnect()
+        await self.__fill()
+        async with self._condition:
+            self._condition.notify_all()
+        return self._lazy or bool(self._members)
+
+    async def send_command(
+        self, command: str, max_retry_time: int = 3, *, timeout: Optional[float] = None
+    ) -> Optional[str]:
+        async with asyncio.timeout(timeout):
+            member = await self.__pick()
+            if member is None:
+                return None
+            member.in_flight += 1
+            try:
+                result = await member.connection.send_command(command, max_retry_time)
+            finally:
+                member.in_flight -= 1
+                await self.__release(member)
+        return result
+
+    async def send_command_parsed(
+        self,
+        command: str,
+        parser: Optional["ResponseParser"] = None,
+        *,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        # Structured result from async_rcon.parsers, None when the command failed.
+        from async_rcon.parsers import require_parser
+
+        parse = parser or require_parser(command)
+        response = await self.send_command(command, timeout=timeout)
+        return None if response is None else parse(response)
+
+    async def stream_command(
+        self, command: str, *, timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        async with asyncio.timeout_at(deadline):
+            member = await self.__pick()
+        if member is None:
+            raise ConnectionError("Rcon pool has no available connection")
+        member.in_flight += 1
+        try:
+            async for text in member.connection.stream_command(
+                command, timeout=None if deadline is None else deadline - loop.time()
+            ):
+                yield text
+        finally:
+            member.in_flight -= 1
+            await self.__release(member)
+
+    async def send_commands(
+        self,
+        commands: list[str],
+        *,
+        chunk_size: int = 1,
+        timeout: Optional[float] = None,
+    ) -> list[Optional[str]]:
+        async with asyncio.timeout(timeout):
+            async with self.acquire() as connection:
+                return await connection.send_commands(commands, chunk_size=chunk_size)
+
+    # Check out one connection exclusively, for commands that must stay together.
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[AsyncRconConnection]:
+        member = await self.__checkout()
+        try:
+            yield member.connection
+        finally:
+            member.checked_out = False
+            await self.__release(member)
+
+    def __alive(self) -> list[_PoolMember]:
+        return [
+            member
+            for member in self._members
+            if not member.checked_out and member.connection.connected
+        ]
+
+    def __least_loaded(self) -> Optional[_PoolMember]:
+        alive = self.__alive()
+        if not alive:
+            return None
+        return min(alive, key=lambda member: member.in_flight)
+
+    async def __pick(self) -> Optional[_PoolMember]:
+        # Waits while every connection is checked out and the pool cannot grow,
+        # callers bound this with their timeout.
+        self._lazy = False
+        async with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                member = self.__least_loaded()
+                if member is not None or self.size + self._opening < self.max_size:
+                    break
+                await self._condition.wait()
+        if member is None:
+            return await self.__open_member()
+        if member.in_flight > 0:
+            self.__grow_in_background()
+        return member
+
+    async def __checkout(self) -> _PoolMember:
+        self._lazy = False
+        async with self._condition:
+            while True:
+                if self._closed:
+                    raise ConnectionError("Rcon pool is closed")
+                for member in self.__alive():
+                    if member.in_flight == 0:
+                        member.checked_out = True
+                        return member
+                if self.size + self._opening < self.max_size:
+                    break
+                await self._condition.wait()
+        member = await self.__open_member()
+        if member is None:
+            raise ConnectionError("Rcon pool cannot open a new connection")
+        member.checked_out = True
+        return member
+
+    async def __release(self, member: _PoolMember):
+        if member in self._retired:
+            if not member.in_flight and not member.checked_out:
+                self._retired.remove(member)
+                await member.connection.disconnect()
+        elif not member.connection.connected:
+            self.__discard(member)
+        async with self._condition:
+            self._condition.notify_all()
+
+    def __discard(self, member: _PoolMember):
+        if member in self._members:
+            self._members.remove(member)
+            asyncio.create_task(member.connection.disconnect())
+            self.__grow_in_background()
+
+    async def __open_member(self) -> Optional[_PoolMember]:
+        if self._closed or self.size + self._opening >= self.max_size:
+            return None
+        self._opening += 1
+        try:
+            connection = AsyncRconConnection(
+                self.address,
+                self.port,
+                self.password,
+                logger=self.logger,
+                pipelined=self.pipelined,
+                pacing=self.pacing_factory() if self.pacing_factory else None,
+                metrics=self.metrics,
+                transport=self.transport,
+            )
+            if not await connection.connect():
+                return None
+            if self._closed or self.__target() != (
+                connection.address,
+                connection.port,
+                connection.password,
+            ):
+                await connection.disconnect()
+                return None
+            member = _PoolMember(connection)
+            self._members.append(member)
+            return member
+        finally:
+            self._opening -= 1
+            # Callers waiting for a connection may use this one or open another.
+            async with self._condition:
+                self._condition.notify_all()
+
+    def __target(self) -> tuple[str, int, str]:
+        return self.address, self.port, self.password
+
+    def __grow_in_background(self):
+        if self._closed or self.size + self._opening >= self.max_size:
+            return
+        if self._grow_task is None or self._grow_task.done():
+            self._grow_task = asyncio.create_task(self.__open_member())
+
+    async def __fill(self):
+        if self._lazy:
+            return
+        missing = self.min_size - self.size - self._opening
+        if missing > 0:
+            await asyncio.gather(*(self.__open_member() for _ in range(missing)))
+
+    async def __maintain(self):
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            for member in list(self._members):
+                if not member.checked_out and not member.connection.connected:
+                    if self.logger:
+                        self.logger.warning("Replacing dead rcon connection in pool...")
+                    self.__discard(member)
+            await self.__fill()
+            async with self._condition:
+                self._condition.notify_all()
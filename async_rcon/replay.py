@@ -0,0 +1,401 @@
+import argparse
+import asyncio
+import cProfile
+import dataclasses
+import json
+import pstats
+import struct
+import sys
+import time
+from typing import Any, Optional, get_args
+
+from async_rcon import AsyncRconConnection
+from async_rcon.capture import CaptureKind, CaptureRecord, read_capture, split_sessions
+from async_rcon.codec import (
+    ENDING_PACKET_RESPONSE_BYTES,
+    RconCodec,
+    _PacketType,
+    decode_response,
+)
+from async_rcon.pacing import PacingMode, create_pacing
+from async_rcon.transport import TransportMode, install_uvloop
+
+_INT32 = struct.Struct("<i")
+
+
+@dataclasses.dataclass(frozen=True)
+class ReplayOperation:
+    # "command", "batch" or "ping", as the recorded client sent it.
+    kind: str
+    commands: tuple[str, ...]
+    # Recorded request IDs of the commands, to look up the recorded responses.
+    request_ids: tuple[int, ...]
+
+
+def session_operations(session: list[CaptureRecord]) -> list[ReplayOperation]:
+    # A command and its end marker share a request ID, a batch ends with one
+    # marker of its own and a keepalive is a marker alone.
+    codec = RconCodec()
+    operations: list[ReplayOperation] = []
+    commands: list[tuple[int, str]] = []
+    for record in session:
+        if record.kind != CaptureKind.SENT:
+            continue
+        codec.receive_data(record.data)
+        for packet in codec.packets():
+            if packet.packet_type == _PacketType.COMMAND_REQUEST:
+                commands.append((packet.request_id, packet.payload))
+                continue
+            if packet.packet_type != _PacketType.ENDING_PACKET:
+                continue
+            if not commands:
+                operations.append(ReplayOperation("ping", (), ()))
+            elif len(commands) == 1 and commands[0][0] == packet.request_id:
+                operations.append(
+                    ReplayOperation("command", (commands[0][1],), (commands[0][0],))
+                )
+            else:
+                ids, texts = zip(*commands)
+                operations.append(ReplayOperation("batch", texts, ids))
+            commands = []
+    return operations
+
+
+def session_responses(session: list[CaptureRecord]) -> dict[int, str]:
+    # Recorded response text per request ID, assembled like the client does.
+    codec = RconCodec()
+    fragments: dict[int, list[bytes]] = {}
+    for record in session:
+        if record.kind != CaptureKind.RECEIVED:
+            continue
+        codec.receive_data(record.data)
+        for packet in codec.raw_packets():
+            body = packet.body
+            if body.endswith(ENDING_PACKET_RESPONSE_BYTES):
+                body = body[: -len(ENDING_PACKET_RESPONSE_BYTES)]
+            if body:
+                fragments.setdefault(packet.request_id, []).append(body)
+    return {request_id: decode_response(f) for request_id, f in fragments.items()}
+
+
+def login_password(session: list[CaptureRecord]) -> str:
+    # The capture masks the password, a mask of the same length produces the
+    # same login packet.
+    codec = RconCodec()
+    for record in session:
+        if record.kind == CaptureKind.SENT:
+            codec.receive_data(record.data)
+            for packet in codec.packets():
+                if packet.packet_type == _PacketType.LOGIN_REQUEST:
+                    return packet.payload
+    return ""
+
+
+class ReplayServer:
+    # Plays one recorded session per accepted connection. Every recorded chunk
+    # goes out once the client sent as many packets as the recorded client had,
+    # after the recorded delay divided by speed (0 sends at once). Request IDs
+    # are rewritten to the ones the replaying client picked.
+    def __init__(
+        self,
+        sessions: list[list[CaptureRecord]],
+        *,
+        speed: float = 1.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.sessions = sessions
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.bytes_sent: int = 0
+        self._next: int = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sessions: set[asyncio.Task] = set()
+
+    async def start(self) -> tuple[str, int]:
+        self._server = await asyncio.start_server(self.__accept, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.host, self.port
+
+    async def close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        for task in list(self._sessions):
+            task.cancel()
+        await asyncio.gather(*self._sessions, return_exceptions=True)
+        if server is not None:
+            await server.wait_closed()
+
+    async def __aenter__(self) -> "ReplayServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def __accept(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        index, self._next = self._next, self._next + 1
+        task = asyncio.current_task()
+        assert task is not None
+        self._sessions.add(task)
+        try:
+            if index < len(self.sessions):
+                await self.__serve(self.sessions[index], reader, writer)
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._sessions.discard(task)
+            writer.close()
+
+    async def __serve(
+        self,
+        session: list[CaptureRecord],
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ):
+        loop = asyncio.get_running_loop()
+        # Recorded request ID and send time of every client packet, and for each
+        # received chunk how many client packets preceded it.
+        sent_ids: list[int] = []
+        sent_times: list[float] = []
+        chunks: list[tuple[CaptureRecord, int]] = []
+        codec = RconCodec()
+        for record in session:
+            if record.kind == CaptureKind.SENT:
+                codec.receive_data(record.data)
+                for packet in codec.raw_packets():
+                    sent_ids.append(packet.request_id)
+                    sent_times.append(record.timestamp)
+            elif record.kind == CaptureKind.RECEIVED:
+                chunks.append((record, len(sent_ids)))
+        stream = bytearray(b"".join(record.data for record, _ in chunks))
+        starts: list[int] = []
+        offset = 0
+        while offset + 12 <= len(stream):
+            starts.append(offset)
+            offset += 4 + _INT32.unpack_from(stream, offset)[0]
+
+        ids: dict[int, int] = {}
+        arrivals: list[float] = []
+        arrived = asyncio.Event()
+        closed = asyncio.Event()
+        started = loop.time()
+
+        async def read_client():
+            client = RconCodec()
+            try:
+                while chunk := await reader.read(2**16):
+                    client.receive_data(chunk)
+                    for packet in client.raw_packets():
+                        if len(arrivals) < len(sent_ids):
+                            ids[sent_ids[len(arrivals)]] = packet.request_id
+                        arrivals.append(loop.time())
+                    arrived.set()
+            finally:
+                closed.set()
+                arrived.set()
+
+        read_task = asyncio.create_task(read_client())
+        try:
+            patched = 0
+            end = 0
+            for record, gate in chunks:
+                while len(arrivals) < gate:
+                    if closed.is_set():
+                        return
+                    arrived.clear()
+                    await arrived.wait()
+                if self.speed > 0:
+                    anchor, recorded = (
+                        (arrivals[gate - 1], sent_times[gate - 1])
+                        if gate
+                        else (started, session[0].timestamp)
+                    )
+                    due = anchor + (record.timestamp - recorded) / self.speed
+                    if (delay := due - loop.time()) > 0:
+                        await asyncio.sleep(delay)
+                begin, end = end, end + len(record.data)
+                while patched < len(starts) and starts[patched] < end:
+                    position = starts[patched] + 4
+                    (request_id,) = _INT32.unpack_from(stream, position)
+                    if request_id in ids:
+                        _INT32.pack_into(stream, position, ids[request_id])
+                    patched += 1
+                writer.write(stream[begin:end])
+                await writer.drain()
+                self.bytes_sent += end - begin
+            await closed.wait()
+        finally:
+            read_task.cancel()
+
+
+async def replay_client(
+    sessions: list[list[CaptureRecord]], args: argparse.Namespace
+) -> dict[str, Any]:
+    operations = commands = failed = mismatched = 0
+    async with ReplayServer(sessions, speed=args.speed) as server:
+        start = time.perf_counter()
+        for session in sessions:
+            meta = session[0].meta()
+            recorded = session_operations(session)
+            expected = session_responses(session)
+            connection = AsyncRconConnection(
+                server.host,
+                server.port,
+                login_password(session),
+                pipelined=(
+                    meta.get("pipelined", False)
+                    if args.pipelined is None
+                    else args.pipelined
+                ),
+                transport=args.transport or meta.get("transport", "streams"),
+                pacing=create_pacing(args.pacing),
+                reconnect=False,
+            )
+            operations += len(recorded)
+            commands += sum(len(operation.commands) for operation in recorded)
+            if not await connection.connect():
+                failed += sum(len(operation.commands) for operation in recorded)
+                continue
+            if connection.pipelined:
+                # Started in recorded order, the write lock keeps that order.
+                tasks = []
+                for operation in recorded:
+                    tasks.append(
+                        asyncio.create_task(run_operation(connection, operation, args))
+                    )
+                    await asyncio.sleep(0)
+                results = await asyncio.gather(*tasks)
+            else:
+                results = [
+                    await run_operation(connection, operation, args)
+                    for operation in recorded
+                ]
+            await connection.disconnect()
+            for operation, responses in zip(recorded, results):
+                for request_id, response in zip(operation.request_ids, responses):
+                    if response is None:
+                        failed += 1
+                    elif response != expected.get(request_id, ""):
+                        mismatched += 1
+        elapsed = time.perf_counter() - start
+        received = server.bytes_sent
+    return {
+        "sessions": len(sessions),
+        "operations": operations,
+        "commands": commands,
+        "failed": failed,
+        "mismatched": mismatched,
+        "received_bytes": received,
+        "elapsed_seconds": elapsed,
+        "commands_per_second": commands / elapsed if elapsed else 0.0,
+    }
+
+
+async def run_operation(
+    connection: AsyncRconConnection,
+    operation: ReplayOperation,
+    args: argparse.Namespace,
+) -> list[Optional[str]]:
+    try:
+        if operation.kind == "ping":
+            await connection.ping(args.timeout)
+            return []
+        if operation.kind == "batch":
+            return await connection.send_commands(
+                list(operation.commands), timeout=args.timeout
+            )
+        return [
+            await connection.send_command(operation.commands[0], timeout=args.timeout)
+        ]
+    except (TimeoutError, ConnectionError):
+        return [None] * len(operation.commands)
+
+
+def replay_decode(
+    sessions: list[list[CaptureRecord]], repeat: int = 1
+) -> dict[str, Any]:
+    # Only the codec and response assembly, no sockets and no event loop.
+    received = sum(
+        len(record.data)
+        for session in sessions
+        for record in session
+        if record.kind == CaptureKind.RECEIVED
+    )
+    responses = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for session in sessions:
+            responses += len(session_responses(session))
+    elapsed = time.perf_counter() - start
+    megabytes = received * repeat / 2**20
+    return {
+        "sessions": len(sessions),
+        "repeat": repeat,
+        "responses": responses,
+        "received_bytes": received,
+        "elapsed_seconds": elapsed,
+        "megabytes_per_second": megabytes / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Replay an rcon capture (capture.enabled in config.yml)."
+    )
+    parser.add_argument("capture")
+    parser.add_argument(
+        "--mode",
+        choices=("client", "decode"),
+        default="client",
+        help="client: AsyncRconConnection against a replay server, "
+        "decode: the codec and response assembly only.",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Multiple of the recorded speed, 0 for as fast as possible.",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    pipelined = parser.add_mutually_exclusive_group()
+    pipelined.add_argument("--pipelined", action="store_true", default=None)
+    pipelined.add_argument("--locked", dest="pipelined", action="store_false")
+    parser.add_argument("--transport", choices=get_args(TransportMode))
+    parser.add_argument("--pacing", choices=get_args(PacingMode), default="none")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--uvloop", action="store_true")
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--output", help="Write JSON results to this file.")
+    args = parser.parse_args(argv)
+    if args.uvloop and not install_uvloop():
+        print("uvloop is not installed, using the default event loop", file=sys.stderr)
+    sessions = split_sessions(read_capture(args.capture))
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    if args.mode == "decode":
+        results = replay_decode(sessions, args.repeat)
+    else:
+        runs = [asyncio.run(replay_client(sessions, args)) for _ in range(args.repeat)]
+        results = runs[-1] if len(runs) == 1 else {"runs": runs}
+    if profiler is not None:
+        profiler.disable()
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(
+            30
+        )
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
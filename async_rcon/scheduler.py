@@ -0,0 +1,266 @@
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict, deque
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional, Protocol
+
+from async_rcon.metrics import Histogram
+
+if TYPE_CHECKING:
+    from async_rcon.parsers import ResponseParser
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    PLUGIN = 1
+    BACKGROUND = 2
+
+
+class SchedulerTarget(Protocol):
+    async def send_command(self, command: str) -> Optional[str]: ...
+
+    def stream_command(
+        self, command: str, *, timeout: Optional[float] = None
+    ) -> AsyncIterator[str]: ...
+
+    async def send_commands(
+        self, commands: list[str], *, chunk_size: int = 1
+    ) -> list[Optional[str]]: ...
+
+
+class _Waiter:
+    def __init__(self, future: asyncio.Future, priority: Priority, source: str):
+        self.future = future
+        self.priority = priority
+        self.source = source
+        self.enqueued = time.perf_counter()
+
+
+class CommandScheduler:
+    def __init__(
+        self,
+        target: SchedulerTarget,
+        *,
+        concurrency: int = 1,
+        max_queued: int = 256,
+        full_timeout: float = 1.0,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.target = target
+        self.concurrency = concurrency
+        # Interactive commands are never rejected, the bound only applies to the
+        # plugin and background classes.
+        self.max_queued = max_queued
+        self.full_timeout = full_timeout
+        # One queue per source in every class, served round robin for fairness.
+        self._queues: list[OrderedDict[str, deque[_Waiter]]] = [
+            OrderedDict() for _ in Priority
+        ]
+        self._depth: list[int] = [0 for _ in Priority]
+        self._running: int = 0
+        self._space = asyncio.Event()
+        self.wait_time: list[Histogram] = [Histogram() for _ in Priority]
+        self.completed: list[int] = [0 for _ in Priority]
+        self.rejected: int = 0
+
+    def resize(self, concurrency: int):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        # Shrinking lets running commands finish, it only delays new grants.
+        self.concurrency = concurrency
+        self.__dispatch()
+
+    @property
+    def queued(self) -> int:
+        return sum(self._depth)
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    async def send_command(
+        self,
+        command: str,
+        *,
+        priority: Priority = Priority.PLUGIN,
+        source: str = "",
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        # timeout includes the time spent waiting in the queue.
+        async with asyncio.timeout(timeout):
+            async with self.slot(priority, source):
+                return await self.target.send_command(command)
+
+    async def send_command_parsed(
+        self,
+        command: str,
+        parser: Optional["ResponseParser"] = None,
+        *,
+        priority: Priority = Priority.PLUGIN,
+        source: str = "",
+        timeout: Optional[float] = None,
+    ) -> Any:
+        from async_rcon.parsers import require_parser
+
+        parse = parser or require_parser(command)
+        response = await self.send_command(
+            command, priority=priority, source=source, timeout=timeout
+        )
+        return None if response is None else parse(response)
+
+    async def stream_command(
+        self,
+        command: str,
+        *,
+        priority: Priority = Priority.PLUGIN,
+        source: str = "",
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        async with asyncio.timeout_at(deadline):
+            await self.__acquire(priority, source)
+        try:
+            async for text in self.target.stream_command(
+                command, timeout=None if deadline is None else deadline - loop.time()
+            ):
+                yield text
+        finally:
+            self.__release(priority)
+
+    async def send_commands(
+        self,
+        commands: list[str],
+        *,
+        chunk_size: int = 1,
+        priority: Priority = Priority.PLUGIN,
+        source: str = "",
+        timeout: Optional[float] = None,
+    ) -> list[Optional[str]]:
+        async with asyncio.timeout(timeout):
+            async with self.slot(priority, source):
+                return await self.target.send_commands(commands, chunk_size=chunk_size)
+
+    @contextlib.asynccontextmanager
+    async def slot(
+        self, priority: Priority = Priority.PLUGIN, source: str = ""
+    ) -> AsyncIterator[None]:
+        await self.__acquire(priority, source)
+        try:
+            yield
+        finally:
+            self.__release(priority)
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "running": self._running,
+            "rejected": self.rejected,
+            **{
+                priority.name.lower(): {
+                    "queued": self._depth[priority],
+                    "completed": self.completed[priority],
+                    **self.wait_time[priority].snapshot(),
+                }
+                for priority in Priority
+            },
+        }
+
+    def describe(self) -> list[str]:
+        lines = [
+            f"running {self._running}/{self.concurrency}, rejected {self.rejected}"
+        ]
+        for priority in Priority:
+            wait = self.wait_time[priority]
+            lines.append(
+                f"{priority.name.lower()}: {self._depth[priority]} queued, "
+                f"{self.completed[priority]} done, "
+                f"wait p50 <= {wait.quantile(0.5) * 1000:g} ms, "
+                f"p99 <= {wait.quantile(0.99) * 1000:g} ms"
+            )
+        return lines
+
+    def __bounded(self) -> int:
+        return self.queued - self._depth[Priority.INTERACTIVE]
+
+    async def __wait_for_space(self):
+        # Backpressure first, callers only get an error after full_timeout.
+        deadline = time.perf_counter() + self.full_timeout
+        while self.__bounded() >= self.max_queued:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self._space.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._space.wait(), timeout=remaining)
+        if self.__bounded() >= self.max_queued:
+            self.rejected += 1
+            raise asyncio.QueueFull(
+                f"Rcon command queue is full ({self.max_queued} commands waiting)"
+            )
+
+    async def __acquire(self, priority: Priority, source: str):
+        if self._running < self.concurrency and not self.queued:
+            self._running += 1
+            self.wait_time[priority].observe(0.0)
+            return
+        if priority != Priority.INTERACTIVE and self.__bounded() >= self.max_queued:
+            await self.__wait_for_space()
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), priority, source)
+        self._queues[priority].setdefault(source, deque()).append(waiter)
+        self._depth[priority] += 1
+        self.__dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted right as we were cancelled, hand the slot on.
+                self._running -= 1
+                self.__dispatch()
+            else:
+                self.__remove(waiter)
+            raise
+
+    def __release(self, priority: Priority):
+        self._running -= 1
+        self.completed[priority] += 1
+        self.__dispatch()
+
+    def __remove(self, waiter: _Waiter):
+        queues = self._queues[waiter.priority]
+        waiters = queues.get(waiter.source)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            self._depth[waiter.priority] -= 1
+            if not waiters:
+                del queues[waiter.source]
+            self._space.set()
+
+    def __next_waiter(self) -> Optional[_Waiter]:
+        for priority, queues in enumerate(self._queues):
+            if not queues:
+                continue
+            source, waiters = next(iter(queues.items()))
+            waiter = waiters.popleft()
+            self._depth[priority] -= 1
+            if waiters:
+                queues.move_to_end(source)
+            else:
+                del queues[source]
+            return waiter
+        return None
+
+    def __dispatch(self):
+        while self._running < self.concurrency:
+            waiter = self.__next_waiter()
+            if waiter is None:
+                break
+            if waiter.future.done():
+                continue
+            self._running += 1
+            self.wait_time[waiter.priority].observe(
+                time.perf_counter() - waiter.enqueued
+            )
+            waiter.future.set_result(None)
+            self._space.set()
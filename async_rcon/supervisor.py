@@ -0,0 +1,132 @@
+import asyncio
+import contextlib
+import random
+import time
+from logging import Logger
+from typing import Callable, Literal, Optional
+
+from async_rcon import AsyncRconConnection
+
+SupervisorState = Literal["stopped", "idle", "connecting", "ready", "backoff"]
+
+
+class ConnectionSupervisor:
+    def __init__(
+        self,
+        connection: AsyncRconConnection,
+        *,
+        keepalive_interval: float = 15.0,
+        keepalive_timeout: float = 5.0,
+        connect_timeout: float = 5.0,
+        backoff_initial: float = 0.5,
+        backoff_max: float = 30.0,
+        backoff_multiplier: float = 2.0,
+        backoff_jitter: float = 0.5,
+        logger: Optional[Logger] = None,
+    ):
+        self.connection = connection
+        self.keepalive_interval = keepalive_interval
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.backoff_multiplier = backoff_multiplier
+        # Fraction of each backoff delay that is randomized, so many clients
+        # restarting together do not reconnect in lockstep.
+        self.backoff_jitter = backoff_jitter
+        self.logger = logger
+        self.state: SupervisorState = "stopped"
+        self.failed_attempts: int = 0
+        self.failed_probes: int = 0
+        # perf_counter() of the first successful connect, for startup timing.
+        self.ready_at: Optional[float] = None
+        # Called after every successful connect, e.g. to flush queued commands.
+        self.on_ready: Optional[Callable[[], None]] = None
+        self._lost = asyncio.Event()
+        self._demand = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, lazy: bool = False) -> asyncio.Task:
+        # lazy defers the first connect until a command needs the connection.
+        if self._task is None or self._task.done():
+            # Commands wait for this task instead of reconnecting inline.
+            self.connection.reconnect = False
+            self.connection.on_connection_lost = self._lost.set
+            self.connection.on_demand = self._demand.set
+            if not lazy:
+                self._demand.set()
+            self.state = "idle"
+            self._task = asyncio.create_task(self.__run())
+        return self._task
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self.connection.on_connection_lost = None
+        self.connection.on_demand = None
+        self._demand.clear()
+        await self.connection.disconnect()
+        self.state = "stopped"
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return await self.connection.wait_ready(timeout)
+
+    def describe(self) -> str:
+        return (
+            f"{self.state}, {self.failed_attempts} failed connects in a row, "
+            f"{self.failed_probes} failed keepalive probes"
+        )
+
+    def backoff_delay(self, attempt: int) -> float:
+        delay = min(
+            self.backoff_max,
+            self.backoff_initial * self.backoff_multiplier ** (attempt - 1),
+        )
+        return delay * (1 - random.uniform(0, self.backoff_jitter))
+
+    async def __run(self):
+        connection = self.connection
+        await self._demand.wait()
+        while True:
+            self._lost.clear()
+            if not connection.connected:
+                self.state = "connecting"
+                if not await connection.connect(timeout=self.connect_timeout):
+                    self.failed_attempts += 1
+                    self.state = "backoff"
+                    delay = self.backoff_delay(self.failed_attempts)
+                    if self.logger:
+                        self.logger.warning(
+                            f"Rcon reconnect failed, retrying in {delay:.1f}s..."
+                        )
+                    await asyncio.sleep(delay)
+                    continue
+                if self.failed_attempts and self.logger:
+                    self.logger.info("Rcon connection restored.")
+                if self.ready_at is None:
+                    self.ready_at = time.perf_counter()
+                self.failed_attempts = 0
+                if self.on_ready is not None:
+                    self.on_ready()
+            self.state = "ready"
+            last_received = connection.last_received
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self._lost.wait(), timeout=self.keepalive_interval
+                )
+                continue
+            # Only probe idle connections, incoming data already proves liveness.
+            if connection.last_received != last_received:
+                continue
+            if not await connection.ping(self.keepalive_timeout):
+                self.failed_probes += 1
+                if self.logger:
+                    self.logger.warning("Rcon keepalive failed, reconnecting...")
+                await connection.disconnect()
@@ -0,0 +1,126 @@
+import asyncio
+import concurrent.futures
+from typing import Callable, Coroutine, Optional, TypeVar
+
+from async_rcon import AsyncRconConnection
+from async_rcon.cache import ResponseCache
+from async_rcon.pool import RconPool
+from async_rcon.scheduler import CommandScheduler, Priority
+
+T = TypeVar("T")
+SyncTarget = AsyncRconConnection | RconPool | CommandScheduler | ResponseCache
+
+
+class SyncRconClient:
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        target: SyncTarget | Callable[[], Optional[SyncTarget]],
+        *,
+        timeout: Optional[float] = 10.0,
+        priority: Priority = Priority.PLUGIN,
+        source: str = "",
+    ):
+        # target may be a callable, so the facade follows plugin reloads.
+        self.loop = loop
+        self._target = target
+        self.timeout = timeout
+        self.priority = priority
+        self.source = source
+
+    def submit(
+        self, command: str, timeout: Optional[float] = None
+    ) -> concurrent.futures.Future[Optional[str]]:
+        # The deadline also applies on the loop side, abandoned futures never
+        # keep a command queued forever.
+        return self.__run(
+            self.__send(command, self.timeout if timeout is None else timeout)
+        )
+
+    def submit_many(
+        self,
+        commands: list[str],
+        *,
+        chunk_size: int = 1,
+        timeout: Optional[float] = None,
+    ) -> concurrent.futures.Future[list[Optional[str]]]:
+        return self.__run(
+            self.__send_many(
+                commands, chunk_size, self.timeout if timeout is None else timeout
+            )
+        )
+
+    def execute(self, command: str, timeout: Optional[float] = None) -> Optional[str]:
+        return self.__wait(self.submit(command, timeout), timeout)
+
+    def execute_many(
+        self,
+        commands: list[str],
+        *,
+        chunk_size: int = 1,
+        timeout: Optional[float] = None,
+    ) -> list[Optional[str]]:
+        # One cross-thread handoff for the whole batch.
+        return self.__wait(
+            self.submit_many(commands, chunk_size=chunk_size, timeout=timeout),
+            timeout,
+        )
+
+    def __resolve(self) -> SyncTarget:
+        target = self._target() if callable(self._target) else self._target
+        if target is None:
+            raise ConnectionError("Rcon client is not initialized")
+        return target
+
+    def __run(self, coro: Coroutine[None, None, T]) -> concurrent.futures.Future[T]:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            coro.close()
+            raise RuntimeError(
+                "SyncRconClient would block its own event loop, await the async API instead"
+            )
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def __wait(
+        self, future: concurrent.futures.Future[T], timeout: Optional[float]
+    ) -> T:
+        try:
+            return future.result(timeout if timeout is not None else self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def __send(self, command: str, timeout: Optional[float]) -> Optional[str]:
+        target = self.__resolve()
+        if isinstance(target, (CommandScheduler, ResponseCache)):
+            return await target.send_command(
+                command, priority=self.priority, source=self.source, timeout=timeout
+            )
+        return await target.send_command(command, timeout=timeout)
+
+    async def __send_many(
+        self, commands: list[str], chunk_size: int, timeout: Optional[float]
+    ) -> list[Optional[str]]:
+        target = self.__resolve()
+        if isinstance(target, ResponseCache):
+            # Batches bypass the cache, but their writes still invalidate it.
+            for command in commands:
+                target.observe(command)
+            assert isinstance(
+                target.target, (AsyncRconConnection, RconPool, CommandScheduler)
+            )
+            target = target.target
+        if isinstance(target, CommandScheduler):
+            return await target.send_commands(
+                commands,
+                chunk_size=chunk_size,
+                priority=self.priority,
+                source=self.source,
+                timeout=timeout,
+            )
+        return await target.send_commands(
+            commands, chunk_size=chunk_size, timeout=timeout
+        )
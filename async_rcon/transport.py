@@ -0,0 +1,140 @@
+import asyncio
+from typing import Callable, Literal, Optional, cast
+
+from async_rcon.codec import RawPacket, RconCodec
+
+TransportMode = Literal["streams", "protocol"]
+
+
+def install_uvloop() -> bool:
+    # uvloop is optional, the protocol transport runs on any event loop.
+    try:
+        import uvloop  # type: ignore[import-not-found]
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+class RconProtocol(asyncio.Protocol):
+    # Feeds the codec straight from data_received. Offers the part of the
+    # StreamWriter interface AsyncRconConnection uses, so it can stand in for it.
+    def __init__(
+        self, codec: RconCodec, on_data: Optional[Callable[[bytes], None]] = None
+    ) -> None:
+        self.codec = codec
+        self.on_data = on_data
+        self.on_packet: Optional[Callable[[RawPacket], None]] = None
+        self.on_lost: Optional[Callable[[Exception], None]] = None
+        self.transport: Optional[asyncio.Transport] = None
+        self._loop = asyncio.get_running_loop()
+        self._waiter: Optional[asyncio.Future] = None
+        self._drain_waiter: Optional[asyncio.Future] = None
+        self._paused: bool = False
+        self._exc: Optional[Exception] = None
+        self._closed: asyncio.Future = self._loop.create_future()
+
+    @property
+    def routing(self) -> bool:
+        return self.on_packet is not None and self._exc is None
+
+    def route(
+        self,
+        on_packet: Callable[[RawPacket], None],
+        on_lost: Callable[[Exception], None],
+    ):
+        # Hand every packet to on_packet as soon as it is decoded, no reader task.
+        self.on_packet = on_packet
+        self.on_lost = on_lost
+        self.__dispatch()
+
+    def connection_made(self, transport: asyncio.BaseTransport):
+        # uvloop transports are not asyncio.Transport subclasses, only look alike.
+        self.transport = cast(asyncio.Transport, transport)
+
+    def data_received(self, data: bytes):
+        self.codec.receive_data(data)
+        if self.on_data is not None:
+            self.on_data(data)
+        if self.on_packet is not None:
+            self.__dispatch()
+        elif self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def eof_received(self) -> bool:
+        self.__fail(ConnectionError("Connection closed while receiving data"))
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.__fail(
+            ConnectionError("Connection closed while receiving data")
+            if exc is None
+            else exc
+        )
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+    async def next_packet(self) -> RawPacket:
+        while (packet := self.codec.next_raw_packet()) is None:
+            if self._exc is not None:
+                raise self._exc
+            self._waiter = self._loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return packet
+
+    def write(self, data: bytes):
+        assert self.transport is not None
+        self.transport.write(data)
+
+    async def drain(self):
+        if self._exc is not None:
+            raise self._exc
+        if self._paused:
+            self._drain_waiter = self._loop.create_future()
+            try:
+                await self._drain_waiter
+            finally:
+                self._drain_waiter = None
+
+    def is_closing(self) -> bool:
+        return self.transport is None or self.transport.is_closing()
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+    async def wait_closed(self):
+        await asyncio.shield(self._closed)
+
+    def __dispatch(self):
+        assert self.on_packet is not None
+        try:
+            while (packet := self.codec.next_raw_packet()) is not None:
+                self.on_packet(packet)
+        except ConnectionError as e:
+            # Malformed stream, there is no way to find the next packet boundary.
+            self.__fail(e)
+            if self.transport is not None:
+                self.transport.abort()
+
+    def __fail(self, exc: Exception):
+        if self._exc is not None:
+            return
+        self._exc = exc
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        if self.on_lost is not None:
+            self.on_lost(exc)
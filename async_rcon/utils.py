@@ -1,40 +1,35 @@
 from functools import wraps
 from inspect import iscoroutinefunction as iscorofunc
+from typing import Optional
 
-from async_rcon.lock import CustomLock
+from async_rcon.lock import LockManager
 
 
-def with_lock(lock: CustomLock | None, option_id: str):
+def with_lock(lock: Optional[LockManager], option_id: str, timeout: float = 5.0):
+    # Skips the call (returning None) when option_id stays locked for timeout
+    # seconds, the lock is released even if the call raises.
     def decorator(func):
         @wraps(func)
-        async def async_wrapper(_lock=lock, _option_id=option_id, *args, **kwargs):
-            if _lock is None:
-                _lock = CustomLock(True, _option_id)
-            else:
-                wait: bool = await _lock.wait_for_lock_release_async(_option_id)
-                if not wait:
-                    return
-                start: bool = await _lock.add_async(_option_id, 0.1, True)
-                if not start:
-                    return
-            result = await func(*args, **kwargs)
-            _lock.remove(_option_id)
-            return result
+        async def async_wrapper(*args, **kwargs):
+            if lock is None:
+                return await func(*args, **kwargs)
+            if not await lock.acquire(option_id, timeout):
+                return None
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                lock.release(option_id)
 
         @wraps(func)
-        def wrapper(_lock=lock, _option_id=option_id, *args, **kwargs):
-            if _lock is None:
-                _lock = CustomLock(True, _option_id)
-            else:
-                wait: bool = _lock.wait_for_lock_release(_option_id)
-                if not wait:
-                    return
-                start: bool = _lock.add(_option_id, 0.1)
-                if not start:
-                    return
-            result = func(*args, **kwargs)
-            _lock.remove(_option_id)
-            return result
+        def wrapper(*args, **kwargs):
+            if lock is None:
+                return func(*args, **kwargs)
+            if not lock.acquire_sync(option_id, timeout):
+                return None
+            try:
+                return func(*args, **kwargs)
+            finally:
+                lock.release(option_id)
 
         return async_wrapper if iscorofunc(func) else wrapper
 
@@ -0,0 +1,322 @@
+import asyncio
+import dataclasses
+import inspect
+from logging import Logger
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+from async_rcon.periodic import PeriodicScheduler, PeriodicSubscription, PeriodicTarget
+
+if TYPE_CHECKING:
+    from async_rcon.parsers import ResponseParser
+
+
+@dataclasses.dataclass(frozen=True)
+class WatchEvent:
+    server: Optional[str]
+    query: str
+    # Parsed result when the query has a parser, the raw text otherwise.
+    value: Any
+    previous: Any
+    # Players, lines or list items that appeared or disappeared, and the keys
+    # whose value changed for dict results (scores, NBT compounds).
+    added: tuple = ()
+    removed: tuple = ()
+    changed: tuple = ()
+
+
+WatchCallback = Callable[[WatchEvent], Optional[Awaitable[None]]]
+
+
+class Watch:
+    def __init__(
+        self,
+        topic: "_WatchTopic",
+        max_age: float,
+        callback: Optional[WatchCallback],
+        queue_size: int,
+    ) -> None:
+        self.topic = topic
+        self.max_age = max_age
+        self.callback = callback
+        # Without a callback events go to this queue, the oldest is dropped
+        # when the consumer falls behind. Every event carries the full value.
+        self.queue: Optional[asyncio.Queue[WatchEvent]] = (
+            None if callback else asyncio.Queue(queue_size)
+        )
+        self.active: bool = True
+        self.dropped: int = 0
+
+    def cancel(self):
+        self.topic.hub.unwatch(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> WatchEvent:
+        if self.queue is None:
+            raise TypeError("This watch delivers to a callback")
+        return await self.queue.get()
+
+
+class _WatchTopic:
+    def __init__(
+        self,
+        hub: "WatchHub",
+        server: Optional[str],
+        query: str,
+        parser: Optional["ResponseParser"],
+    ) -> None:
+        self.hub = hub
+        self.server = server
+        self.query = query
+        self.parser = parser
+        self.watches: list[Watch] = []
+        self.subscription: Optional[PeriodicSubscription] = None
+        self.value: Any = None
+        self.has_value: bool = False
+        self.events: int = 0
+        self.parse_errors: int = 0
+
+
+class WatchHub:
+    # Subscribers that watch the same query on the same server share one
+    # topic: one poll, one parse and one diff, whatever their number. The
+    # poll runs at the tightest max_age among them.
+    def __init__(
+        self,
+        periodic: PeriodicScheduler,
+        servers: Optional[Callable[[str], PeriodicTarget]] = None,
+        *,
+        logger: Optional[Logger] = None,
+    ):
+        self.periodic = periodic
+        # Resolves a named server, usually MultiServerClient.get.
+        self.servers = servers
+        self.logger = logger
+        self.topics: dict[tuple[Optional[str], str, Any], _WatchTopic] = {}
+        self._schedulers: dict[str, PeriodicScheduler] = {}
+        self._callbacks: set[asyncio.Task] = set()
+
+    @property
+    def watches(self) -> int:
+        return sum(len(topic.watches) for topic in self.topics.values())
+
+    def watch(
+        self,
+        query: str,
+        max_age: float,
+        callback: Optional[WatchCallback] = None,
+        *,
+        server: Optional[str] = None,
+        parser: Optional["ResponseParser"] = None,
+        queue_size: int = 100,
+    ) -> Watch:
+        # max_age is the refresh budget, how stale the value may get in seconds.
+        # Queries with a known parser (list, scoreboard, data get...) are
+        # parsed unless parser is given, the others are diffed line by line.
+        from async_rcon.parsers import parser_for
+
+        if max_age <= 0:
+            raise ValueError("max_age must be positive")
+        # Raises KeyError for unknown servers before anything is registered.
+        scheduler = self.__scheduler(server)
+        query = query.strip()
+        parser = parser or parser_for(query)
+        key = (server, query, parser)
+        topic = self.topics.get(key)
+        if topic is None:
+            topic = self.topics[key] = _WatchTopic(self, server, query, parser)
+        watch = Watch(topic, max_age, callback, queue_size)
+        topic.watches.append(watch)
+        self.__resubscribe(topic, scheduler)
+        if topic.has_value:
+            # Late subscribers start from the current value.
+            asyncio.get_running_loop().call_soon(
+                self.__deliver, watch, self.__event(topic, None, topic.value)
+            )
+        return watch
+
+    def unwatch(self, watch: Watch):
+        if not watch.active:
+            return
+        watch.active = False
+        topic = watch.topic
+        topic.watches.remove(watch)
+        if topic.watches:
+            self.__resubscribe(topic, self.__scheduler(topic.server))
+            return
+        self.topics.pop((topic.server, topic.query, topic.parser), None)
+        if topic.subscription is not None:
+            topic.subscription.cancel()
+
+    async def drop_server(self, name: str):
+        # The named server went away, its watches stop receiving events.
+        for topic in [t for t in self.topics.values() if t.server == name]:
+            for watch in list(topic.watches):
+                self.unwatch(watch)
+        scheduler = self._schedulers.pop(name, None)
+        if scheduler is not None:
+            await scheduler.stop()
+
+    async def stop(self):
+        for topic in list(self.topics.values()):
+            for watch in list(topic.watches):
+                self.unwatch(watch)
+        schedulers = list(self._schedulers.values())
+        self._schedulers.clear()
+        for scheduler in schedulers:
+            await scheduler.stop()
+        for task in list(self._callbacks):
+            task.cancel()
+        await asyncio.gather(*self._callbacks, return_exceptions=True)
+
+    def stats(self) -> dict[str, int]:
+        topics = self.topics.values()
+        return {
+            "topics": len(self.topics),
+            "watches": self.watches,
+            "events": sum(topic.events for topic in topics),
+            "parse_errors": sum(topic.parse_errors for topic in topics),
+            "dropped": sum(w.dropped for topic in topics for w in topic.watches),
+        }
+
+    def describe(self, limit: int = 20) -> list[str]:
+        lines = [", ".join(f"{key}: {value}" for key, value in self.stats().items())]
+        topics = sorted(self.topics.values(), key=lambda t: -len(t.watches))
+        for topic in topics[:limit]:
+            where = f"@{topic.server} " if topic.server else ""
+            interval = min(watch.max_age for watch in topic.watches)
+            lines.append(
+                f"{where}{topic.query!r} every {interval:g}s for "
+                f"{len(topic.watches)} watches: {topic.events} events"
+            )
+        if len(topics) > limit:
+            lines.append(f"... and {len(topics) - limit} more")
+        return lines
+
+    def __scheduler(self, server: Optional[str]) -> PeriodicScheduler:
+        if server is None:
+            return self.periodic
+        scheduler = self._schedulers.get(server)
+        if scheduler is None:
+            if self.servers is None:
+                raise KeyError(f"Unknown rcon server: {server}")
+            periodic = self.periodic
+            scheduler = PeriodicScheduler(
+                self.servers(server),
+                max_concurrent=periodic.max_concurrent,
+                timeout=periodic.timeout,
+                spread=periodic.spread,
+                logger=self.logger,
+            )
+            scheduler.start()
+            self._schedulers[server] = scheduler
+        return scheduler
+
+    def __resubscribe(self, topic: _WatchTopic, scheduler: PeriodicScheduler):
+        interval = min(watch.max_age for watch in topic.watches)
+        previous = topic.subscription
+        if previous is not None and previous.interval == interval:
+            return
+        # Subscribe before cancelling, so the shared poll keeps its schedule.
+        topic.subscription = scheduler.subscribe(
+            topic.query, interval, lambda result: self.__update(topic, result)
+        )
+        if previous is not None:
+            previous.cancel()
+
+    def __update(self, topic: _WatchTopic, result: str):
+        if topic.parser is not None:
+            try:
+                value = topic.parser(result)
+            except ValueError as e:
+                # Usually an error message instead of the expected output.
+                topic.parse_errors += 1
+                if self.logger:
+                    self.logger.debug(f"Watch {topic.query!r}: {e}")
+                return
+        else:
+            value = result
+        if topic.has_value and value == topic.value:
+            return
+        event = self.__event(topic, topic.value, value)
+        topic.value, topic.has_value = value, True
+        topic.events += 1
+        for watch in list(topic.watches):
+            self.__deliver(watch, event)
+
+    def __event(self, topic: _WatchTopic, previous: Any, value: Any) -> WatchEvent:
+        added, removed, changed = diff_values(previous, value)
+        return WatchEvent(
+            topic.server, topic.query, value, previous, added, removed, changed
+        )
+
+    def __deliver(self, watch: Watch, event: WatchEvent):
+        if not watch.active:
+            return
+        if watch.queue is not None:
+            if watch.queue.full():
+                watch.queue.get_nowait()
+                watch.dropped += 1
+            watch.queue.put_nowait(event)
+            return
+        assert watch.callback is not None
+        try:
+            outcome = watch.callback(event)
+        except Exception as e:
+            self.__callback_failed(watch, e)
+            return
+        if inspect.isawaitable(outcome):
+            task = asyncio.ensure_future(outcome)
+            self._callbacks.add(task)
+            task.add_done_callback(lambda done: self.__callback_done(watch, done))
+
+    def __callback_done(self, watch: Watch, task: asyncio.Task):
+        self._callbacks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.__callback_failed(watch, task.exception())
+
+    def __callback_failed(self, watch: Watch, e: BaseException):
+        if self.logger:
+            self.logger.warning(f"Watch on {watch.topic.query!r} failed: {e!r}")
+
+
+def diff_view(value: Any) -> Any:
+    # The part of a parsed result that deltas are computed on.
+    from async_rcon.parsers import DataResult, PlayerList, Score, ScoreList, TimeQuery
+
+    if isinstance(value, PlayerList):
+        return value.players
+    if isinstance(value, ScoreList):
+        return value.scores
+    if isinstance(value, (DataResult, Score, TimeQuery)):
+        return value.value
+    if isinstance(value, str):
+        return tuple(line for line in value.splitlines() if line)
+    return value
+
+
+def diff_values(previous: Any, value: Any) -> tuple[tuple, tuple, tuple]:
+    # (added, removed, changed), the first value counts as entirely added.
+    # Scalars have no parts, the event itself is the change.
+    old, new = diff_view(previous), diff_view(value)
+    if isinstance(new, dict):
+        old = old if isinstance(old, dict) else {}
+        return (
+            tuple(key for key in new if key not in old),
+            tuple(key for key in old if key not in new),
+            tuple(key for key in new if key in old and old[key] != new[key]),
+        )
+    if isinstance(new, (list, tuple)):
+        old = old if isinstance(old, (list, tuple)) else ()
+        try:
+            before, after = dict.fromkeys(old), dict.fromkeys(new)
+        except TypeError:
+            # Compounds in an NBT list, compare previous and value instead.
+            return (), (), ()
+        return (
+            tuple(item for item in after if item not in before),
+            tuple(item for item in before if item not in after),
+            (),
+        )
+    return (), (), ()
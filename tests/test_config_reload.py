@@ -0,0 +1,118 @@
+import asyncio
+import copy
+import logging
+import os
+import types
+
+import pytest
+from ruamel.yaml import YAML
+
+import async_rcon.entry as entry
+from async_rcon.config import PluginConfig
+from async_rcon.mock_server import MockRconServer
+
+
+class FakeServer:
+    # The parts of PluginServerInterface the plugin uses while loading.
+    _mcdr_server = types.SimpleNamespace(
+        command_manager=types.SimpleNamespace(root_nodes={})
+    )
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self.logger = logging.getLogger("async_rcon.test")
+
+    def get_data_folder(self) -> str:
+        return self.folder
+
+    def get_mcdr_config(self) -> dict:
+        return {}
+
+    def get_event_loop(self) -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    def register_command(self, *args, **kwargs):
+        pass
+
+    def get_self_metadata(self):
+        return types.SimpleNamespace(id="async_rcon")
+
+
+def write(path: str, content):
+    with open(path, "w") as f:
+        if isinstance(content, str):
+            f.write(content)
+        else:
+            YAML().dump(content, f)
+
+
+BAD_TYPE = "bad-type"
+MISSING_KEY = "missing-key"
+EMPTY = "empty"
+TRUNCATED = "truncated"
+
+
+def broken(config: dict, case: str):
+    match case:
+        case "bad-type":
+            config["custom_server"]["port"] = "nope"
+            return config
+        case "missing-key":
+            # Also wrong, merging the defaults used to hide it.
+            config["custom_server"]["port"] = "nope"
+            del config["servers"]
+            return config
+        case "empty":
+            return ""
+    return "use_mcdr_config: false\ncustom_server: {host: [\n"
+
+
+@pytest.mark.parametrize("case", [BAD_TYPE, MISSING_KEY, EMPTY, TRUNCATED])
+def test_reload_keeps_config_on_invalid_file(tmp_path, case):
+    async def run():
+        async with MockRconServer() as main, MockRconServer() as lobby:
+            path = os.path.join(tmp_path, "config.yml")
+            config = PluginConfig().model_dump()
+            config["use_mcdr_config"] = False
+            config["custom_server"] = {
+                "host": main.host,
+                "port": main.port,
+                "password": main.password,
+            }
+            config["servers"] = [
+                {
+                    "name": "lobby",
+                    "host": lobby.host,
+                    "port": lobby.port,
+                    "password": lobby.password,
+                    "tags": [],
+                }
+            ]
+            config["reload"] = {"watch": True, "interval": 0.05}
+            write(path, config)
+            server = FakeServer(str(tmp_path))
+            await entry.on_load(server, None)
+            try:
+                loaded = entry.config
+                write(path, broken(copy.deepcopy(config), case))
+                lines = await entry.reload_config(server)
+                assert "keeping the current config" in lines[0]
+                assert entry.config is loaded
+                assert entry.multi is not None and entry.multi.names == ["lobby"]
+                assert await entry.multi.get("lobby").send_command("echo up") == "up"
+
+                # The watcher survives the bad save and applies the next one.
+                await asyncio.sleep(0.2)
+                assert entry.config_watcher is not None
+                assert not entry.config_watcher.done()
+                config["servers"][0]["tags"] = ["hub"]
+                write(path, config)
+                for _ in range(40):
+                    await asyncio.sleep(0.05)
+                    if entry.multi.select("hub") == ["lobby"]:
+                        break
+                assert entry.multi.select("hub") == ["lobby"]
+            finally:
+                await entry.on_unload(server)
+
+    asyncio.run(run())
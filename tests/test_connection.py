@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from async_rcon import AsyncRconConnection
+from async_rcon.codec import decode_response
+from async_rcon.mock_server import MockRconServer
+from async_rcon.pacing import create_pacing
+
+MODES = [
+    pytest.param(False, "streams", id="locked"),
+    pytest.param(True, "streams", id="pipelined"),
+    pytest.param(True, "protocol", id="pipelined-protocol"),
+]
+
+
+async def connect(server: MockRconServer, pipelined: bool, transport: str):
+    connection = AsyncRconConnection(
+        server.host,
+        server.port,
+        server.password,
+        pipelined=pipelined,
+        pacing=create_pacing("none"),
+        transport=transport,
+    )
+    assert await connection.connect()
+    return connection
+
+
+@pytest.mark.parametrize("pipelined, transport", MODES)
+def test_empty_responses(pipelined, transport):
+    # say, tellraw and title succeed without output, that is "" and not None.
+    async def run():
+        async with MockRconServer() as server:
+            connection = await connect(server, pipelined, transport)
+            try:
+                assert await connection.send_command("say hello") == ""
+                results = await connection.send_commands(["say hello", "echo x"] * 50)
+                assert results == ["", "x"] * 50
+            finally:
+                await connection.disconnect()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("pipelined, transport", MODES)
+def test_large_response(pipelined, transport):
+    size = 300_000
+
+    async def run():
+        async with MockRconServer() as server:
+            connection = await connect(server, pipelined, transport)
+            try:
+                response = await connection.send_command(f"blob {size}")
+                assert response is not None and len(response) == size
+                streamed = [t async for t in connection.stream_command(f"blob {size}")]
+                assert "".join(streamed) == response
+            finally:
+                await connection.disconnect()
+
+    asyncio.run(run())
+
+
+def test_decode_response_across_fragments():
+    text = "abcdéfgh你好" * 100
+    data = text.encode("utf8")
+    fragments = [data[i : i + 7] for i in range(0, len(data), 7)]
+    assert decode_response(fragments) == text
+    assert decode_response([]) == ""
+    assert decode_response([b"ok \xe4"]) == "ok �"
@@ -0,0 +1,31 @@
+import asyncio
+
+from async_rcon.periodic import PeriodicScheduler
+
+
+class EchoTarget:
+    async def send_command(self, command, timeout=None):
+        return command
+
+
+def test_reschedule_updates_jitter_and_phase():
+    async def run():
+        periodic = PeriodicScheduler(EchoTarget(), spread=0.0)
+        loop = asyncio.get_running_loop()
+        periodic.subscribe("list", 60, lambda result: None, jitter=0.5)
+        job = periodic.jobs["list"]
+        # Same interval, the job still follows the lowest jitter.
+        subscription = periodic.subscribe("list", 60, lambda result: None, jitter=0.1)
+        assert job.jitter == 0.1
+        subscription.cancel()
+        assert job.jitter == 0.5
+        # A new spread draws a new phase within it for the next registration.
+        periodic.spread = 10.0
+        periodic.subscribe("list", 60, lambda result: None)
+        assert job.spread == 10.0
+        assert job.due - loop.time() <= 10.0
+        periodic.subscribe("list", 2, lambda result: None)
+        assert job.interval == 2 and job.due - loop.time() <= 2
+        await periodic.stop()
+
+    asyncio.run(run())